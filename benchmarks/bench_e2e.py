@@ -0,0 +1,426 @@
+"""
+端到端离线基准 (Offline end-to-end benchmark)
+
+在本地启动三个平台的模拟服务，用伪造的消息事件驱动 ParseHub.on_message，走完
+识别 -> 解析 -> 下载 -> 发送的完整流程，在不同并发下统计吞吐、延迟分位数与峰值 RSS。
+(Runs local stand-ins for all three platforms and pushes fake message events through
+ParseHub.on_message, measuring links/sec, p50/p95/p99 and peak RSS per concurrency level.)
+
+模拟服务 (Stand-ins):
+    - B站 view / playurl 接口 (Bilibili view / playurl)
+    - 抖音详情接口、msToken/ttwid 接口与短链重定向 (Douyin detail API, token endpoints, share redirect)
+    - XHS-Downloader 解析接口 (XHS-Downloader endpoint)
+    - CDN：体积、首字节延迟、403 比例可调 (CDN with configurable size, latency and 403 rate)
+    --throttle 按比例让各平台接口返回限流响应 (B站 -412、抖音空响应、XHS 429)
+
+每个并发档位在独立子进程中运行，峰值 RSS 互不影响；模拟服务在单独的进程中，不计入。
+消息识别由 PlatformRegistry 按域名后缀查找各平台注册的分享链接域名，本地地址不会被识别，
+因此消息中使用真实域名的链接，再把各处理器的接口地址指向模拟服务；抖音短链的重定向请求发往
+真实域名，无法路由到本地，由 AwemeIdFetcher 单独测量。
+未安装 AstrBot 时注入只含日志与消息组件的最小替身，仅供本基准使用。
+
+用法 (Usage):
+    python benchmarks/bench_e2e.py                  # 并发 1,4,16，每档 60 条链接 (60 links per level)
+    python benchmarks/bench_e2e.py -c 1,8,32 -n 300 --media-kb 2048 --cdn-latency 50 --cdn-403 0.1 --throttle 0.05
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import socket
+import asyncio
+import logging
+import argparse
+import importlib
+import tempfile
+import subprocess
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+# 以插件包的形式导入，与 AstrBot 加载方式一致 (Import as the plugin package, like AstrBot does)
+_plugin = os.path.basename(ROOT)
+
+# 分别统计的阶段 (Stages reported from the plugin's own metrics)
+STAGES = ("parse.xhs", "parse.dy", "parse.bili", "dy.sign", "dy.api", "download.ttfb", "download")
+FAILURE_PREFIXES = ("❌", "⏱️", "🚦", "⚠️")
+
+
+# ================= 模拟服务 (Stand-in servers) =================
+
+def serve(args) -> None:
+    from aiohttp import web
+
+    base = f"http://127.0.0.1:{args.port}"
+    rng = random.Random(args.seed)
+    media = random.Random(args.seed).randbytes(args.media_kb * 1024)
+
+    def throttled() -> bool:
+        return rng.random() < args.throttle
+
+    async def index(request):
+        return web.Response(text="ok")
+
+    async def xhs(request):
+        link = (await request.json())["url"]
+        if throttled(): return web.Response(status=429)
+        key = link.rstrip("/").rsplit("/", 1)[-1]
+        return web.json_response({"message": "获取数据成功", "data": {
+            "作品标题": f"笔记 {key}", "作者昵称": "模拟作者", "作品描述": "离线基准",
+            "作品类型": "视频", "下载地址": [f"{base}/cdn/xhs-{key}.mp4"], "动图地址": [],
+        }})
+
+    async def bili_view(request):
+        bvid = request.query["bvid"]
+        if throttled(): return web.json_response({"code": -412, "message": "请求被拦截"})
+        aid = int(bvid[3:])
+        return web.json_response({"code": 0, "data": {
+            "title": f"视频 {bvid}", "owner": {"name": "模拟UP主"}, "desc": "离线基准",
+            "aid": aid, "cid": aid + 1, "pic": f"{base}/cdn/bili-{bvid}.jpg",
+        }})
+
+    async def bili_play(request):
+        aid = request.query["avid"]
+        return web.json_response({"code": 0, "data": {"durl": [{"url": f"{base}/cdn/bili-{aid}.mp4"}]}})
+
+    async def dy_detail(request):
+        aweme_id = request.query["aweme_id"]
+        if throttled(): return web.Response(body=b"")
+
+        def gear(name, width, height, bit_rate):
+            urls = [f"{base}/cdn/dy-{aweme_id}-{name}.mp4?mirror={m}" for m in range(2)]
+            return {"gear_name": name, "bit_rate": bit_rate, "is_h265": 0, "play_addr": {
+                "url_list": urls, "width": width, "height": height, "data_size": len(media)}}
+
+        bit_rate = [gear("1080p", 1920, 1080, 2500000), gear("720p", 1280, 720, 1200000), gear("540p", 960, 540, 600000)]
+        return web.json_response({"status_code": 0, "aweme_detail": {
+            "aweme_id": aweme_id, "desc": f"抖音作品 {aweme_id}", "create_time": 1710000000,
+            "author": {"nickname": "模拟作者", "uid": "1"},
+            "video": {"duration": 15000, "bit_rate": bit_rate, "play_addr": bit_rate[-1]["play_addr"]},
+            "statistics": {"digg_count": 1, "comment_count": 2},
+        }})
+
+    async def ms_token(request):
+        resp = web.Response(text="ok")
+        resp.set_cookie("msToken", "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(128)))
+        return resp
+
+    async def ttwid(request):
+        resp = web.Response(text="ok")
+        resp.set_cookie("ttwid", "1%7Cbench")
+        return resp
+
+    async def share(request):
+        # 短链的形式：/s/<作品 ID> 重定向到作品页 (Short link: redirect to the work page)
+        raise web.HTTPFound(f"/video/{request.match_info['code']}")
+
+    async def cdn(request):
+        if args.cdn_latency: await asyncio.sleep(args.cdn_latency / 1000)
+        if rng.random() < args.cdn_403: return web.Response(status=403)
+        return web.Response(body=media, content_type="video/mp4" if request.path.endswith(".mp4") else "image/jpeg")
+
+    app = web.Application()
+    app.add_routes([
+        web.get("/", index),
+        web.post("/xhs/", xhs),
+        web.get("/x/web-interface/view", bili_view),
+        web.get("/x/player/playurl", bili_play),
+        web.get("/aweme/v1/web/aweme/detail/", dy_detail),
+        web.post("/mssdk", ms_token),
+        web.post("/ttwid", ttwid),
+        web.get("/s/{code}", share),
+        web.get("/video/{aweme_id}", index),
+        web.get("/cdn/{name}", cdn),
+    ])
+    web.run_app(app, host="127.0.0.1", port=args.port, print=None, access_log=None)
+
+
+# ================= 压测进程 (Load worker) =================
+
+def install_astrbot_stub() -> None:
+    """未安装 AstrBot 时注入最小替身，只提供插件导入时用到的名字"""
+    try:
+        importlib.import_module("astrbot.api.event")
+        return
+    except ImportError:
+        pass
+
+    class Component:
+        def __init__(self, *args, **kwargs):
+            self.args, self.kwargs = args, kwargs
+
+        @classmethod
+        def fromURL(cls, url): return cls(url)
+
+        @classmethod
+        def fromFileSystem(cls, path): return cls(path)
+
+    class Filter:
+        EventMessageType = types.SimpleNamespace(ALL="all")
+        def command(self, name): return lambda func: func
+        def event_message_type(self, kind): return lambda func: func
+
+    class Star:
+        def __init__(self, context): self.context = context
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    modules = {
+        "astrbot": {},
+        "astrbot.api": {"logger": logging.getLogger("astrbot")},
+        "astrbot.api.event": {"filter": Filter(), "AstrMessageEvent": object},
+        "astrbot.api.star": {"Context": object, "Star": Star, "register": lambda *a, **k: (lambda cls: cls)},
+        "astrbot.api.message_components": {name: type(name, (Component,), {}) for name in ("Plain", "Image", "Video", "File")},
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+class BenchEvent:
+    """只实现插件用到的接口的消息事件 (A message event implementing just what the plugin calls)"""
+
+    def __init__(self, text: str):
+        self.message_str = text
+        self.message_obj = None
+
+    def is_admin(self) -> bool:
+        return False
+
+    def plain_result(self, text: str):
+        return "plain", text
+
+    def chain_result(self, chain: list):
+        return "chain", chain
+
+    async def send(self, result):
+        return None
+
+
+def make_links(n: int) -> list:
+    """三个平台轮流，每条链接的作品 ID 都不同，避免命中下载缓存"""
+    links = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0: links.append(f"看看这篇笔记 https://xhslink.com/b{i:06d}")
+        elif kind == 1: links.append(f"https://www.douyin.com/video/{7300000000000000000 + i}")
+        else: links.append(f"https://www.bilibili.com/video/BV1{i:09d}")
+    return links
+
+
+def patch_endpoints(base: str) -> None:
+    """把各平台接口地址指向模拟服务 (Point platform endpoints at the stand-ins)"""
+    importlib.import_module(f"{_plugin}.bili").BiliHandler.API_BASE = base
+    endpoints = importlib.import_module(f"{_plugin}.douyin_scraper.crawlers.douyin.web.endpoints")
+    endpoints.DouyinAPIEndpoints.POST_DETAIL = f"{base}/aweme/v1/web/aweme/detail/"
+    tokens = importlib.import_module(f"{_plugin}.douyin_scraper.crawlers.douyin.web.utils").TokenManager
+    tokens.token_conf = {"url": f"{base}/mssdk", "magic": 538969122, "version": 1, "dataType": 8,
+                         "strData": "bench", "User-Agent": "Mozilla/5.0"}
+    tokens.ttwid_conf = {"url": f"{base}/ttwid", "data": "{}"}
+    tokens.proxies = {}
+
+
+async def drive(hub, text: str):
+    """推送一条消息并消费全部回复，返回 (是否送达文件, 失败原因)"""
+    delivered, reason = False, "无回复"
+    async for kind, payload in hub.on_message(BenchEvent(text)):
+        if kind == "chain" and any(type(c).__name__ == "File" for c in payload):
+            delivered = True
+        elif kind == "plain" and payload.startswith(FAILURE_PREFIXES):
+            reason = payload.splitlines()[0][:40]
+    return delivered, None if delivered else reason
+
+
+async def resolve_redirects(base: str, concurrency: int, n: int) -> list:
+    """短链重定向：AwemeIdFetcher 跟随 /s/<ID> 的 302 并从落地地址提取作品 ID"""
+    fetcher = importlib.import_module(f"{_plugin}.douyin_scraper.crawlers.douyin.web.utils").AwemeIdFetcher
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        aweme_id = str(7400000000000000000 + i)
+        async with sem:
+            start = time.perf_counter()
+            if await fetcher.get_aweme_id(f"{base}/s/{aweme_id}") == aweme_id:
+                latencies.append(time.perf_counter() - start)
+    await asyncio.gather(*(one(i) for i in range(n)), return_exceptions=True)
+    return latencies
+
+
+def peak_rss_mib():
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+async def run_level(args) -> dict:
+    base = f"http://127.0.0.1:{args.port}"
+    install_astrbot_stub()
+    main = importlib.import_module(f"{_plugin}.main")
+    metrics = importlib.import_module(f"{_plugin}.metrics")
+    patch_endpoints(base)
+
+    cache_dir = tempfile.mkdtemp(prefix="parsehub-bench-")
+    hub = main.ParseHub(None, {
+        "cache_dir": cache_dir,
+        "api_url": f"{base}/xhs/",
+        "api_rate_limit": 10 ** 6,
+        "cache_cleanup_interval": 0,
+        "metrics_file_interval": 0,
+        "loop_lag_threshold_ms": 0,
+    })
+    await hub.initialize()
+    baseline = peak_rss_mib()
+
+    links = make_links(args.n)
+    sem = asyncio.Semaphore(args.concurrency)
+    latencies, failures = [], Counter()
+
+    async def one(text):
+        async with sem:
+            start = time.perf_counter()
+            try:
+                delivered, reason = await drive(hub, text)
+            except Exception as e:
+                delivered, reason = False, type(e).__name__
+            if delivered: latencies.append(time.perf_counter() - start)
+            else: failures[reason] += 1
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(text) for text in links))
+        wall = time.perf_counter() - started
+        redirects = await resolve_redirects(base, args.concurrency, min(args.n, 30))
+    finally:
+        await hub.terminate()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    stages = metrics.summary()["stages"]
+    return {
+        "concurrency": args.concurrency,
+        "links": len(links),
+        "ok": len(latencies),
+        "failures": dict(failures),
+        "wall": wall,
+        "latencies": sorted(latencies),
+        "redirects": sorted(redirects),
+        "rss_baseline": baseline,
+        "rss_peak": peak_rss_mib(),
+        "stages": {name: stages[name] for name in STAGES if name in stages},
+    }
+
+
+# ================= 汇总 (Driver) =================
+
+def quantile(ordered: list, q: float) -> float:
+    if not ordered: return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def shared_args(args) -> list:
+    return ["--port", str(args.port), "--seed", str(args.seed), "--media-kb", str(args.media_kb),
+            "--cdn-latency", str(args.cdn_latency), "--cdn-403", str(args.cdn_403), "--throttle", str(args.throttle)]
+
+
+def report(result: dict) -> None:
+    lat = result["latencies"]
+    rss = lambda v: f"{v:>8.1f}" if v is not None else f"{'-':>8}"
+    print(f"{result['concurrency']:>5} {result['links']:>6} {result['ok']:>5} {result['links'] - result['ok']:>5} "
+          f"{result['links'] / result['wall']:>8.2f} {quantile(lat, 0.5) * 1000:>8.1f} {quantile(lat, 0.95) * 1000:>8.1f} "
+          f"{quantile(lat, 0.99) * 1000:>8.1f} {rss(result['rss_baseline'])} {rss(result['rss_peak'])} "
+          f"{quantile(result['redirects'], 0.5) * 1000:>9.1f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--concurrency", default="1,4,16", help="并发档位，逗号分隔 (comma-separated levels)")
+    parser.add_argument("-n", type=int, default=60, help="每档链接数 (links per level)")
+    parser.add_argument("--media-kb", type=int, default=512, help="CDN 返回的文件大小 KiB (media size in KiB)")
+    parser.add_argument("--cdn-latency", type=float, default=20, help="CDN 首字节延迟 ms (CDN latency in ms)")
+    parser.add_argument("--cdn-403", type=float, default=0.0, help="CDN 返回 403 的比例 (share of CDN 403s)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="接口返回限流的比例 (share of throttled API calls)")
+    parser.add_argument("--seed", type=int, default=2024, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", metavar="OUT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return 0
+    if args.worker:
+        args.concurrency = int(args.concurrency)
+        result = asyncio.run(run_level(args))
+        with open(args.worker, "w", encoding="utf-8") as f: json.dump(result, f)
+        return 0
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    args.port = args.port or free_port()
+    server = subprocess.Popen([sys.executable, __file__, "--serve", *shared_args(args)])
+    results = []
+    try:
+        if not wait_for_port(args.port):
+            print("模拟服务启动失败 (stand-in server did not start)")
+            return 1
+        print(f"mock 127.0.0.1:{args.port}, media {args.media_kb} KiB, cdn latency {args.cdn_latency:g} ms, "
+              f"403 {args.cdn_403:.0%}, throttle {args.throttle:.0%}")
+        print(f"{'conc':>5} {'links':>6} {'ok':>5} {'fail':>5} {'links/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'rss0 MiB':>8} {'peak MiB':>8} {'redir p50':>9}")
+        for level in levels:
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f: out = f.name
+            try:
+                # 结果经临时文件传回，子进程的标准输出丢弃，日志 (stderr) 保留 (Results come back via a file)
+                code = subprocess.call([sys.executable, __file__, "--worker", out, "-c", str(level), "-n", str(args.n),
+                                        *shared_args(args)], stdout=subprocess.DEVNULL)
+                if code != 0:
+                    print(f"并发 {level} 的压测进程异常退出 (worker exited with {code})")
+                    return 1
+                with open(out, encoding="utf-8") as f: result = json.load(f)
+            finally:
+                os.remove(out)
+            results.append(result)
+            report(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    for result in results:
+        if result["failures"]:
+            reasons = ", ".join(f"{reason} x{n}" for reason, n in sorted(result["failures"].items(), key=lambda kv: -kv[1]))
+            print(f"并发 {result['concurrency']} 失败原因 (failures): {reasons}")
+    print("\n各阶段 p50 / p95 ms (per-stage, from the plugin's metrics)")
+    for result in results:
+        stages = "  ".join(f"{name} {s['p50_ms']:g}/{s['p95_ms']:g}" for name, s in result["stages"].items())
+        print(f"  c={result['concurrency']:<3} {stages}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
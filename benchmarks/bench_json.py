@@ -0,0 +1,124 @@
+"""
+抖音详情响应的 JSON 解码基准 (Decode benchmark for Douyin aweme/detail responses)
+
+全程离线，使用固定种子生成的模拟响应体，对比：
+(Fully offline, uses a seeded synthetic payload and compares:)
+    - 旧路径：bytes -> str -> json.loads，再提取字段 (old path: decode text, full tree, then pick)
+    - fastjson.extract：直接解码 bytes 并立即提取 (decode bytes and pick immediately)
+      分别在 orjson 与标准库 json 后端下测试 (on both the orjson and stdlib backends)
+
+用法 (Usage):
+    python benchmarks/bench_json.py            # 默认 200 次 (200 ops per case)
+    python benchmarks/bench_json.py -n 1000 --size 800
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import importlib
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+# 以插件包的形式导入，与 AstrBot 加载方式一致 (Import as the plugin package, like AstrBot does)
+_plugin = os.path.basename(ROOT)
+fastjson = importlib.import_module(f"{_plugin}.fastjson")
+DouyinParser = importlib.import_module(f"{_plugin}.douyin_scraper.douyin_parser").DouyinParser
+
+
+def make_payload(target_kb: int, seed: int = 2024) -> bytes:
+    """生成结构接近 aweme/detail 的响应体 (Build a body shaped like aweme/detail)"""
+    rng = random.Random(seed)
+
+    def url_list(n=3):
+        return [f"https://v{i}-web.douyinvod.com/{rng.getrandbits(128):032x}/video/tos/cn/mp4?a=6383&br={rng.randint(500, 3000)}" for i in range(n)]
+
+    def blob(n):
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz中文字段") for _ in range(n))
+
+    detail = {
+        "aweme_id": "7345492945006595379",
+        "desc": blob(80),
+        "create_time": 1710000000,
+        "author": {"nickname": "作者", "uid": "1", "avatar_thumb": {"url_list": url_list()}, "signature": blob(60)},
+        "video": {
+            "play_addr": {"url_list": url_list(), "data_size": 12345678},
+            "cover": {"url_list": url_list()},
+            "bit_rate": [{"gear_name": f"normal_{i}", "bit_rate": rng.randint(500000, 3000000),
+                          "play_addr": {"url_list": url_list()}} for i in range(6)],
+        },
+        "statistics": {"digg_count": 1, "comment_count": 2},
+        "music": {"title": blob(20), "play_url": {"url_list": url_list()}},
+        "text_extra": [],
+        "comments_preview": [],
+    }
+    body = {"aweme_detail": detail, "status_code": 0, "log_pb": {"impr_id": "x"}}
+    while len(json.dumps(body).encode()) < target_kb * 1024:
+        detail["text_extra"].append({"hashtag_name": blob(12), "hashtag_id": str(rng.getrandbits(60))})
+        detail["comments_preview"].append({"text": blob(120), "user": {"nickname": blob(8), "avatar": {"url_list": url_list(2)}}})
+    return json.dumps(body, ensure_ascii=False).encode()
+
+
+def old_path(content: bytes, process):
+    # httpx 的 response.json()：先解码为 str，再用标准库解析，完整数据树在处理期间一直存活
+    raw = json.loads(content.decode("utf-8"))
+    return process(raw), raw
+
+
+def bench(name: str, func, n: int) -> None:
+    for _ in range(min(n, 10)):
+        func()
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - t)
+    samples.sort()
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = func()
+    retained = tracemalloc.get_traced_memory()[0] - base
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    del result
+
+    p50 = samples[len(samples) // 2] / 1e6
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1e6
+    print(f"{name:<28} p50 {p50:>7.2f} ms  p99 {p99:>7.2f} ms  peak {peak / 1024:>8.1f} KiB  retained {retained / 1024:>7.1f} KiB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200, help="每项执行次数 (ops per case)")
+    parser.add_argument("--size", type=int, default=400, help="响应体大小 KiB (payload size in KiB)")
+    args = parser.parse_args()
+
+    content = make_payload(args.size)
+    process = DouyinParser(cookie="")._process_data
+    expected = process(json.loads(content))
+    print(f"payload {len(content) / 1024:.0f} KiB, orjson {'可用' if fastjson.orjson else '未安装'}")
+
+    bench("json.loads(text) + process", lambda: old_path(content, process), args.n)
+
+    backends = [("orjson", fastjson.orjson)] if fastjson.orjson else []
+    backends.append(("json", None))
+    saved = fastjson.orjson
+    try:
+        for label, module in backends:
+            fastjson.orjson = module
+            if fastjson.extract(content, process) != expected:
+                print(f"提取结果不一致 (mismatch) [{label}]")
+                return 1
+            bench(f"fastjson.extract [{label}]", lambda: fastjson.extract(content, process), args.n)
+    finally:
+        fastjson.orjson = saved
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
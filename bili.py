@@ -1,14 +1,26 @@
 import os
 import re
-import json
 import asyncio
 import aiohttp
 import aiofiles
 import qrcode
-from urllib.parse import unquote
+from urllib.parse import unquote, urlparse
 from astrbot.api import logger
 
+from .deadline import budget
+from . import fastjson
+from .douyindownload import SmartDownloader
+from .proxy_pool import ProxyPool
+from .models import MediaItem, ParseResult
+from .registry import host_suffixes
+from . import metrics
+
 class BiliHandler:
+    # 接口域名，离线基准会替换为本地模拟服务
+    API_BASE = "https://api.bilibili.com"
+    PASSPORT_BASE = "https://passport.bilibili.com"
+    SHORT_HOSTS = frozenset(("b23.tv", "bili2233.cn"))   # 需要先跟随重定向的短链域名
+
     def __init__(self, cache_dir: str, use_login: bool = False):
         self.cache_dir = cache_dir
         self.use_login = use_login
@@ -37,10 +49,14 @@ class BiliHandler:
         }
         if headers: default_headers.update(headers)
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=default_headers, timeout=30) as resp:
-                    if return_json: return await resp.json()
-                    return await resp.read()
+            with metrics.timer("bili.api", url=url.split("?")[0]):
+                async with aiohttp.ClientSession() as session, ProxyPool.use(url) as proxy:
+                    timeout = aiohttp.ClientTimeout(total=budget(30))
+                    async with session.get(url, headers=default_headers, timeout=timeout, proxy=proxy) as resp:
+                        # 412 为B站风控拦截，统一转成 -412 业务码交给上层判断
+                        if resp.status in (412, 429): return {"code": -412, "message": f"请求被风控拦截 (HTTP {resp.status})"} if return_json else None
+                        if return_json: return await fastjson.read_json(resp)
+                        return await resp.read()
         except Exception as e:
             logger.error(f"Bili Request Error: {e}")
             return None
@@ -50,23 +66,23 @@ class BiliHandler:
         try:
             async with aiofiles.open(self.cookie_file, "r", encoding="utf-8") as f:
                 content = await f.read()
-                return json.loads(content) if content else None
+                return fastjson.loads(content) if content else None
         except: return None
 
     async def save_cookies(self, cookies):
         async with aiofiles.open(self.cookie_file, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(cookies, indent=2))
+            await f.write(fastjson.dumps(cookies, indent=True))
 
     async def check_cookie_valid(self):
         cookies = await self.load_cookies()
         if not cookies: return False
-        url = "https://api.bilibili.com/x/member/web/account"
+        url = f"{self.API_BASE}/x/member/web/account"
         headers = {"Cookie": "; ".join([f"{k}={v}" for k, v in cookies.items()])}
         data = await self._request(url, headers)
         return data and data.get("code") == 0
 
     async def get_login_qr(self):
-        url = "https://passport.bilibili.com/x/passport-login/web/qrcode/generate"
+        url = f"{self.PASSPORT_BASE}/x/passport-login/web/qrcode/generate"
         data = await self._request(url)
         if not data or data.get("code") != 0: return None
         qr_url = data["data"]["url"]
@@ -80,7 +96,7 @@ class BiliHandler:
         return {"key": qrcode_key, "img_path": qr_path, "url": qr_url}
 
     async def poll_login(self, qrcode_key):
-        url = f"https://passport.bilibili.com/x/passport-login/web/qrcode/poll?qrcode_key={qrcode_key}"
+        url = f"{self.PASSPORT_BASE}/x/passport-login/web/qrcode/poll?qrcode_key={qrcode_key}"
         data = await self._request(url)
         if data and data.get("code") == 0:
             if data["data"]["code"] == 0:
@@ -95,111 +111,132 @@ class BiliHandler:
             elif data["data"]["code"] == 86038: return False
         return None
 
-    async def parse(self, raw_url: str):
-        result = {"success": False, "msg": "", "type": "video", "bvid": "", "title": ""}
+    async def parse(self, raw_url: str) -> ParseResult:
         bvid = None
-        if "b23.tv" in raw_url or "bili2233" in raw_url:
+        if not self.SHORT_HOSTS.isdisjoint(host_suffixes(urlparse(raw_url).hostname or "")):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.head(raw_url, allow_redirects=True) as resp:
-                        raw_url = str(resp.url)
+                with metrics.timer("bili.resolve"):
+                    async with aiohttp.ClientSession() as session, ProxyPool.use(raw_url) as proxy:
+                        timeout = aiohttp.ClientTimeout(total=budget(15))
+                        async with session.head(raw_url, allow_redirects=True, timeout=timeout, proxy=proxy) as resp:
+                            raw_url = str(resp.url)
             except: pass
         match = self.REG_BV.search(raw_url)
         if match: bvid = match.group()
-        else:
-            result["msg"] = "未找到BV号"
-            return result
+        else: return ParseResult.fail("bili", "未找到BV号")
 
-        info_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
+        info_url = f"{self.API_BASE}/x/web-interface/view?bvid={bvid}"
         info = await self._request(info_url)
         if not info or info.get("code") != 0:
-            result["msg"] = f"获取信息失败: {info.get('message') if info else 'Network Error'}"
-            return result
+            return ParseResult.fail("bili", f"获取信息失败: {info.get('message') if info else 'Network Error'}",
+                                    throttled=bool(info) and info.get("code") in (-412, -352))
         
         v_data = info["data"]
-        result["success"] = True
-        result["title"] = v_data["title"]
-        result["author"] = v_data["owner"]["name"]
-        result["desc"] = v_data["desc"]
-        result["bvid"] = bvid
-        result["cid"] = v_data["cid"]
-        result["aid"] = v_data["aid"]
-        result["download_urls"] = [v_data["pic"]] 
-        return result
-
-    async def get_stream_url(self, parse_result):
-        bvid = parse_result["bvid"]
-        cid = parse_result["cid"]
-        aid = parse_result["aid"]
+        return ParseResult(
+            "bili", success=True, kind=MediaItem.VIDEO, work_id=bvid,
+            title=v_data["title"], author=v_data["owner"]["name"], desc=v_data["desc"],
+            media=[MediaItem(v_data["pic"], MediaItem.COVER, content_id=f"bili:{bvid}:cover")],
+            notice="注: B站直链有时效性且需Referer，建议复制到浏览器查看",
+            extra={"aid": v_data["aid"], "cid": v_data["cid"]},
+        )
+
+    async def get_stream_url(self, parse_result: ParseResult):
+        cid = parse_result.extra["cid"]
+        aid = parse_result.extra["aid"]
         headers = {"Referer": "https://www.bilibili.com/"}
         if self.use_login:
             cookies = await self.load_cookies()
             if cookies: headers["Cookie"] = "; ".join([f"{k}={v}" for k, v in cookies.items()])
 
-        play_url = f"https://api.bilibili.com/x/player/playurl?avid={aid}&cid={cid}&qn=64&fnval=1&platform=html5"
+        play_url = f"{self.API_BASE}/x/player/playurl?avid={aid}&cid={cid}&qn=64&fnval=1&platform=html5"
         data = await self._request(play_url, headers)
         if data and data.get("code") == 0:
             durl = data["data"].get("durl")
             if durl: return durl[0]["url"]
         return "获取失败"
 
-    async def download_bili_video(self, parse_result):
-        bvid = parse_result["bvid"]
-        cid = parse_result["cid"]
-        aid = parse_result["aid"]
+    async def download_bili_video(self, parse_result: ParseResult):
+        bvid = parse_result.work_id
+        cid = parse_result.extra["cid"]
+        aid = parse_result.extra["aid"]
         final_path = os.path.join(self.cache_dir, f"{bvid}.mp4")
         if os.path.exists(final_path) and os.path.getsize(final_path) > 0:
+            metrics.inc("cache", cache="bili_video", result="hit")
             return final_path
+        metrics.inc("cache", cache="bili_video", result="miss")
 
         headers = {"Referer": "https://www.bilibili.com/", "User-Agent": "Mozilla/5.0"}
         if self.use_login:
             cookies = await self.load_cookies()
             if cookies: headers["Cookie"] = "; ".join([f"{k}={v}" for k, v in cookies.items()])
 
-        play_url = f"https://api.bilibili.com/x/player/playurl?avid={aid}&cid={cid}&qn=80&fnval=16&fourk=1"
+        play_url = f"{self.API_BASE}/x/player/playurl?avid={aid}&cid={cid}&qn=80&fnval=16&fourk=1"
         data = await self._request(play_url, headers)
         if not data or data.get("code") != 0: return None
         
+        # 主地址与 backupUrl 一起作为镜像列表，交给下载器竞速
         try:
             dash = data["data"]["dash"]
-            v_url = dash["video"][0]["baseUrl"]
-            a_url = dash["audio"][0]["baseUrl"]
+            v_urls = self._mirror_list(dash["video"][0], "baseUrl", "base_url", "backupUrl", "backup_url")
+            a_urls = self._mirror_list(dash["audio"][0], "baseUrl", "base_url", "backupUrl", "backup_url")
         except:
             try:
                 durl = data["data"]["durl"]
-                v_url = durl[0]["url"]
-                a_url = None
+                v_urls = self._mirror_list(durl[0], "url", "backup_url")
+                a_urls = None
             except: return None
 
         v_path = os.path.join(self.cache_dir, f"{bvid}_v.m4s")
         a_path = os.path.join(self.cache_dir, f"{bvid}_a.m4s")
+        # ffmpeg 先写临时文件，成功后再改名，被取消或失败时不会留下半截的缓存
+        part_path = final_path + ".part"
 
+        cookie = headers.get("Cookie")
+        referer = headers["Referer"]
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(v_url, headers=headers) as resp:
-                    if resp.status != 200: return None
-                    with open(v_path, "wb") as f: f.write(await resp.read())
-            
-            if a_url:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(a_url, headers=headers) as resp:
-                        if resp.status != 200: return None
-                        with open(a_path, "wb") as f: f.write(await resp.read())
-            
-            if a_url:
-                cmd = f'ffmpeg -y -i "{v_path}" -i "{a_path}" -c:v copy -c:a copy "{final_path}" -loglevel quiet'
+            if not await SmartDownloader.download(v_urls[0], v_path, cookie, referer, mirrors=v_urls, timeout=300):
+                return None
+            if a_urls and not await SmartDownloader.download(a_urls[0], a_path, cookie, referer, mirrors=a_urls, timeout=300):
+                return None
+
+            if a_urls:
+                args = ["-i", v_path, "-i", a_path, "-c:v", "copy", "-c:a", "copy"]
             else:
-                cmd = f'ffmpeg -y -i "{v_path}" -c copy "{final_path}" -loglevel quiet'
-            
-            proc = await asyncio.create_subprocess_shell(cmd)
-            await proc.communicate()
-            
-            if os.path.exists(v_path): os.remove(v_path)
-            if os.path.exists(a_path): os.remove(a_path)
-            
-            if os.path.exists(final_path) and os.path.getsize(final_path) > 0:
-                return final_path
-            return None
+                args = ["-i", v_path, "-c", "copy"]
+            with metrics.timer("bili.ffmpeg"):
+                code = await self._run_ffmpeg(["ffmpeg", "-y", *args, "-f", "mp4", part_path, "-loglevel", "quiet"])
+
+            if code != 0 or not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+                logger.error(f"B站合并失败: ffmpeg 退出码 {code}")
+                return None
+            os.replace(part_path, final_path)
+            return final_path
         except Exception as e:
             logger.error(f"B站下载合并失败: {e}")
-            return None
\ No newline at end of file
+            return None
+        finally:
+            for path in (v_path, a_path, part_path):
+                if os.path.exists(path): os.remove(path)
+
+    @staticmethod
+    def _mirror_list(entry, *keys):
+        """按字段顺序收集主地址与备用地址并去重，主地址在前"""
+        urls = []
+        for key in keys:
+            value = entry.get(key)
+            if isinstance(value, str): urls.append(value)
+            elif value: urls.extend(value)
+        return list(dict.fromkeys(u for u in urls if u))
+
+    async def _run_ffmpeg(self, cmd) -> int:
+        """执行 ffmpeg 并返回退出码；任务被取消或超时时结束子进程，不留僵尸进程"""
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            return await asyncio.wait_for(proc.wait(), budget(600))
+        except BaseException:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            raise
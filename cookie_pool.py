@@ -0,0 +1,94 @@
+import time
+
+from .douyin_scraper.cookie_extractor import extract_douyin_cookies
+
+
+class PooledCookie:
+    """池中的单个 Cookie 及其健康统计"""
+
+    def __init__(self, cookie: str, valid: bool, index: int):
+        self.cookie = cookie
+        self.valid = valid
+        self.label = f"#{index + 1}"
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+    def success_rate(self) -> float:
+        # 拉普拉斯平滑，新 Cookie 按 0.5 计
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def cooling(self) -> float:
+        return max(0.0, self.cooldown_until - time.monotonic())
+
+    def health(self) -> float:
+        """健康分：成功率为主，缺少关键字段的 Cookie 降权，并发中的请求越多分越低"""
+        score = self.success_rate() * (1.0 if self.valid else 0.5)
+        return score / (1 + self.in_flight)
+
+
+class CookiePool:
+    """
+    抖音 Cookie 池：按健康分挑选 Cookie，空响应/风控时自动冷却，
+    冷却时间随连续失败次数翻倍，成功一次即清零
+    """
+    EWMA_ALPHA = 0.3
+    FAIL_THRESHOLD = 2  # 连续失败多少次后冷却 (收到限流信号时立即冷却)
+
+    def __init__(self, cookies: list, cooldown: float = 300, max_cooldown: float = 3600):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.entries = []
+        for raw in dict.fromkeys(c.strip() for c in cookies if c and len(c.strip()) > 20):
+            _, valid, _ = extract_douyin_cookies(raw)
+            self.entries.append(PooledCookie(raw, valid, len(self.entries)))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def invalid_labels(self) -> list:
+        return [e.label for e in self.entries if not e.valid]
+
+    def peek(self):
+        """当前最健康的 Cookie；全部冷却中时取最先结束冷却的；池为空返回 None"""
+        if not self.entries: return None
+        ready = [e for e in self.entries if not e.cooling()]
+        if not ready: return min(self.entries, key=lambda e: e.cooldown_until)
+        return max(ready, key=lambda e: (e.health(), -(e.latency or 0)))
+
+    def acquire(self):
+        entry = self.peek()
+        if entry: entry.in_flight += 1
+        return entry
+
+    def release(self, entry, ok: bool, latency: float = None, throttled: bool = False):
+        """归还 Cookie 并记录结果；ok 为 None 表示失败与 Cookie 无关，不计入统计"""
+        if entry is None: return
+        entry.in_flight = max(0, entry.in_flight - 1)
+        if ok is None: return
+        if latency is not None:
+            entry.latency = latency if entry.latency is None else entry.latency + self.EWMA_ALPHA * (latency - entry.latency)
+        if ok:
+            entry.successes += 1
+            entry.consecutive_failures = 0
+            return
+        entry.failures += 1
+        entry.consecutive_failures += 1
+        if throttled or entry.consecutive_failures >= self.FAIL_THRESHOLD:
+            steps = max(0, entry.consecutive_failures - self.FAIL_THRESHOLD)
+            entry.cooldown_until = time.monotonic() + min(self.cooldown * 2 ** steps, self.max_cooldown)
+
+    def snapshot(self) -> list:
+        """每个 Cookie 的成功率、延迟与冷却状态（不输出 Cookie 内容）"""
+        return [{
+            "cookie": e.label,
+            "valid": e.valid,
+            "requests": e.successes + e.failures,
+            "success_rate": round(e.successes / (e.successes + e.failures), 3) if e.successes + e.failures else None,
+            "latency_ms": round(e.latency * 1000) if e.latency is not None else None,
+            "in_flight": e.in_flight,
+            "cooldown_seconds": round(e.cooling(), 1),
+        } for e in self.entries]
@@ -0,0 +1,68 @@
+import time
+import asyncio
+from contextvars import ContextVar
+
+_current = ContextVar("parse_hub_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """任务总时长超出预算"""
+    def __init__(self, stage: str = "", budget: float = 0):
+        super().__init__(stage)
+        self.stage = stage
+        self.budget = budget
+
+
+class StageTimeout(DeadlineExceeded):
+    """阶段内部的请求自身超时，任务预算尚未用完"""
+
+
+class Deadline:
+    """单个解析任务的总时长预算，逐级传递给解析/下载/合并/上传各阶段"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = None) -> float:
+        """返回本阶段可用的超时时间：剩余预算与阶段上限取小"""
+        left = self.remaining()
+        return min(cap, left) if cap else left
+
+    def check(self, stage: str = ""):
+        if self.expired: raise DeadlineExceeded(stage, self.budget)
+
+    async def run(self, aw, stage: str = ""):
+        """在剩余预算内执行一个阶段，超时则取消其中未完成的请求/子进程"""
+        if self.expired:
+            if asyncio.iscoroutine(aw): aw.close()
+            raise DeadlineExceeded(stage, self.budget)
+        token = _current.set(self)
+        try:
+            return await asyncio.wait_for(aw, self.remaining())
+        except asyncio.TimeoutError:
+            # 内部请求自身的超时不算作任务超时，但同样带上阶段名交给任务处理
+            if self.expired: raise DeadlineExceeded(stage, self.budget)
+            raise StageTimeout(stage, self.budget)
+        finally:
+            _current.reset(token)
+
+
+def budget(cap: float) -> float:
+    """供各处理器使用：不超过当前任务剩余预算的超时时间"""
+    deadline = _current.get()
+    if deadline is None: return cap
+    return max(0.001, deadline.timeout(cap))
+
+
+def expired() -> bool:
+    """当前任务的总预算是否已用完；不在任务中时返回 False"""
+    deadline = _current.get()
+    return deadline is not None and deadline.expired
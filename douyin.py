@@ -1,63 +1,85 @@
 import re
-import os
-import sys
-import importlib.util
+import time
+import importlib
 from astrbot.api import logger
 
-# ================= 1. 动态加载 douyin_scraper =================
-DouyinParser = None
-
-try:
-    current_file = os.path.abspath(__file__)
-    current_dir = os.path.dirname(current_file)
-    
-    if current_dir not in sys.path:
-        sys.path.insert(0, current_dir)
-    
-    scraper_root = os.path.join(current_dir, "douyin_scraper")
-    
-    # 根据实际结构定位解析器文件
-    parser_file_path = os.path.join(scraper_root, "douyin_parser.py")
-    
-    if not os.path.exists(parser_file_path):
-        logger.error(f"❌ 找不到解析器文件: {parser_file_path}")
-    else:
-        # 补全 __init__.py
-        for root, dirs, files in os.walk(scraper_root):
-            if "__init__.py" not in files:
-                try:
-                    with open(os.path.join(root, "__init__.py"), 'w') as f: pass
-                except: pass
-
-        # 尝试导入
-        logger.info("[DouyinHandler] 正在导入 DouyinParser...")
+from .cookie_pool import CookiePool
+from .proxy_pool import ProxyPool
+from .models import MediaItem, ParseResult
+from . import fastjson, metrics
+
+# ================= 1. 按需加载 douyin_scraper =================
+# 抓取库依赖较重 (httpx/yaml 等)，首次解析抖音链接时才导入，插件加载时不做任何导入和文件写入
+_scraper = None
+_log_manager = None
+
+
+def load_scraper():
+    """
+    导入 douyin_scraper，返回 (DouyinParser, BogusManager, TokenService)，失败时返回 None。
+    抓取库的日志改为经有界队列在后台线程转交给宿主的处理器，不在事件循环上写终端/文件
+    """
+    global _scraper, _log_manager
+    if _scraper is None:
         try:
-            from douyin_scraper.douyin_parser import DouyinParser
-            logger.info("[DouyinHandler] ✅ 导入成功！")
-        except ImportError as e:
-            # 尝试将 crawlers 子目录也加入路径
-            crawlers_path = os.path.join(scraper_root, "crawlers")
-            if crawlers_path not in sys.path:
-                sys.path.insert(0, crawlers_path)
-            try:
-                from douyin_scraper.douyin_parser import DouyinParser
-                logger.info("[DouyinHandler] ✅ 备选导入成功！")
-            except ImportError:
-                logger.error(f"❌ 无法加载 DouyinParser: {e}")
-
-except Exception as e:
-    logger.error(f"[DouyinHandler] 导入严重错误: {e}")
-
-if DouyinParser is None:
-    class DouyinParser:
-        def __init__(self, **kwargs): pass
-        async def parse(self, url): return None
+            parser = importlib.import_module(".douyin_scraper.douyin_parser", __package__)
+            utils = importlib.import_module(".douyin_scraper.crawlers.douyin.web.utils", __package__)
+            logs = importlib.import_module(".douyin_scraper.crawlers.utils.logger", __package__)
+            _log_manager = logs.LogManager()
+            _log_manager.forward_to()
+            _scraper = (parser.DouyinParser, utils.BogusManager, utils.TokenService)
+            logger.info("[DouyinHandler] ✅ DouyinParser 导入成功！")
+        except Exception as e:
+            logger.error(f"❌ 无法加载 DouyinParser: {e}")
+            _scraper = False
+    return _scraper or None
 
 # ================= 2. 处理器类 =================
 
 class DouyinHandler:
-    def __init__(self, cookie: str = None):
-        self.cookie = cookie if cookie and len(cookie) > 20 else None
+    def __init__(self, cookie: str = None, max_video_mb: int = 0, video_codec: str = "h264",
+                 cookies: list = None, cookie_cooldown: int = 300):
+        # 单个 douyin_cookie 与 douyin_cookies 列表合并为一个 Cookie 池
+        self.cookie_pool = CookiePool([cookie, *(cookies or [])], cooldown=cookie_cooldown)
+        if self.cookie_pool.invalid_labels():
+            logger.warning(f"[DouyinHandler] Cookie {', '.join(self.cookie_pool.invalid_labels())} 缺少关键字段，已降低其优先级")
+        self.max_video_bytes = max(0, max_video_mb or 0) * 1024 * 1024
+        self.video_codec = video_codec
+        self.started = False
+        self.scraper = None
+
+    def _load(self):
+        """首次解析时加载抓取库，并启动令牌刷新"""
+        if self.scraper is None:
+            with metrics.timer("dy.load"):
+                self.scraper = load_scraper()
+            if not self.scraper: return None
+            _, _, tokens = self.scraper
+            if self.started: tokens.start()
+        return self.scraper
+
+    @property
+    def cookie(self):
+        """当前最健康的 Cookie，供下载等请求复用"""
+        entry = self.cookie_pool.peek()
+        return entry.cookie if entry else None
+
+    def start(self):
+        """标记插件已启动；msToken/ttwid 后台刷新在抓取库加载后开始"""
+        self.started = True
+        if self.scraper: self.scraper[2].start()
+
+    @property
+    def log_dropped(self) -> int:
+        """抓取库日志队列积压时丢弃的条数"""
+        return _log_manager.dropped if _log_manager else 0
+
+    def close(self):
+        if self.scraper:
+            _, bogus, tokens = self.scraper
+            bogus.shutdown()
+            tokens.stop()
+        if _log_manager: _log_manager.detach()
 
     def extract_url(self, text: str):
         pattern = r'(https?://[^\s]+)'
@@ -65,78 +87,67 @@ class DouyinHandler:
         if match: return match.group(0)
         return None
 
-    async def parse(self, target_url: str) -> dict:
-        result = {
-            "success": False, "msg": "", "type": "video",
-            "title": "", "author": "", "desc": "",
-            "download_urls": [], "dynamic_urls": [], "video_url": None
-        }
-
+    async def parse(self, target_url: str) -> ParseResult:
+        entry = self.cookie_pool.acquire()
+        started = time.monotonic()
+        outcome = None  # 与 Cookie 无关的失败不计入 Cookie 健康统计
+        result = None
         try:
-            if DouyinParser is None:
-                result["msg"] = "解析引擎加载失败"
+            scraper = self._load()
+            if not scraper:
+                result = ParseResult.fail("dy", "解析引擎加载失败")
                 return result
 
-            parser = DouyinParser(cookie=self.cookie)
+            parser = scraper[0](cookie=entry.cookie if entry else None, max_video_bytes=self.max_video_bytes,
+                                video_codec=self.video_codec, json_backend=fastjson, metrics=metrics, proxies=ProxyPool)
             data = await parser.parse(target_url)
             
             if not data:
-                result["msg"] = "解析结果为空 (Cookie无效/风控)"
+                outcome = False
+                result = ParseResult.fail("dy", "解析结果为空 (Cookie无效/风控)")
                 return result
-            
-            # 数据清洗
-            result["success"] = True
-            result["title"] = data.get("title") or data.get("desc") or "抖音作品"
-            result["desc"] = data.get("desc") or ""
-            result["author"] = data.get("author_nickname") or data.get("author", {}).get("nickname", "未知作者")
-            
-            media_type = data.get("media_type") 
+
+            if data.get("error"):
+                details = data.get("details", "")
+                # 空响应体与 429 是抖音限流的典型表现 (由解析器按状态码判断)，交给熔断器统计
+                result = ParseResult.fail("dy", f"{data['error']}: {details}" if details else data["error"],
+                                          throttled=bool(data.get("throttled")))
+                # 只有请求详情接口失败才记到 Cookie 头上，链接本身无效不算
+                if data["error"].startswith("Failed to fetch"): outcome = False
+                return result
+            outcome = True
+
             raw_type = data.get("type", "video")
-            media_urls = data.get("media_urls", [])
-
-            # 视频
-            if raw_type == "video":
-                result["type"] = "video"
-                if media_urls:
-                    result["video_url"] = media_urls[0]
-                else:
-                    # 备用路径
-                    video_data = data.get("video_data", {})
-                    v_url = video_data.get("nwm_video_url") or data.get("url")
-                    if v_url:
-                        result["video_url"] = v_url
-                    else:
-                        result["success"] = False
-                        result["msg"] = "未找到视频链接"
-
-            # 图文
-            elif raw_type == "image":
-                result["type"] = "image"
-                if media_urls:
-                    result["download_urls"] = media_urls
-                else:
-                    # 备用路径
-                    images = data.get("image_data", {}).get("no_watermark_image_list", [])
-                    if images:
-                        result["download_urls"] = images
-                    else:
-                        result["success"] = False
-                        result["msg"] = "未找到图片列表"
-            else:
-                # 尝试推断
-                if media_urls and len(media_urls) == 1 and ".mp4" in media_urls[0]:
-                    result["type"] = "video"
-                    result["video_url"] = media_urls[0]
-                elif media_urls:
-                    result["type"] = "image"
-                    result["download_urls"] = media_urls
-                else:
-                    result["success"] = False
-                    result["msg"] = f"未知数据类型: {raw_type}"
+            if raw_type not in ("video", "image", "multi_video"):
+                result = ParseResult.fail("dy", f"未知数据类型: {raw_type}")
+                return result
+
+            # 每个资源带上全部镜像，供下载器竞速与故障切换
+            aweme_id = data.get("aweme_id")
+            media = [
+                MediaItem(url, kind, mirrors, size, f"dy:{aweme_id}:{i}" if aweme_id else None)
+                for i, (url, mirrors, kind, size) in enumerate(zip(
+                    data.get("media_urls", []), data.get("media_mirrors", []),
+                    data.get("media_kinds", []), data.get("media_sizes", [])))
+            ]
+            # 图文中夹带视频片段 (multi_video) 时按图文发送，片段仍以视频文件发出
+            kind = MediaItem.VIDEO if raw_type == "video" else MediaItem.IMAGE
+            if not media:
+                result = ParseResult.fail("dy", "未找到视频链接" if kind == MediaItem.VIDEO else "未找到图片列表")
+                return result
+
+            result = ParseResult(
+                "dy", success=True, kind=kind, work_id=aweme_id,
+                title=data.get("title") or data.get("desc") or "抖音作品",
+                author=data.get("author_nickname") or "未知作者",
+                desc=data.get("desc") or "", media=media,
+            )
+            if kind == MediaItem.VIDEO: result.stream_url = media[0].url
 
         except Exception as e:
             logger.error(f"DouyinParser 执行错误: {e}")
-            result["success"] = False
-            result["msg"] = f"解析内部错误: {e}"
+            result = ParseResult.fail("dy", f"解析内部错误: {e}")
+        finally:
+            self.cookie_pool.release(entry, outcome, time.monotonic() - started, bool(result and result.throttled))
 
-        return result
\ No newline at end of file
+        return result
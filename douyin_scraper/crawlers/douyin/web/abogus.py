@@ -15,17 +15,20 @@ Changes Made:
 1. Changed the ua_code to compatible with the current config file User-Agent string in https://github.com/Evil0ctal/Douyin_TikTok_Download_API/blob/main/crawlers/douyin/web/config.yaml
 """
 
-from random import choice
-from random import randint
-from random import random
+from base64 import b64encode
+import random as _random
 from re import compile
 from time import time
 from urllib.parse import urlencode
 from urllib.parse import quote
-from gmssl import sm3, func
+
+from .sm3 import sm3_digest
+from .rc4 import rc4_keystream, xor_bytes
 
 __all__ = ["ABogus", ]
 
+_B64_STANDARD = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
 
 class ABogus:
     __filter = compile(r'%([0-9A-F]{2})')
@@ -34,16 +37,6 @@ class ABogus:
     __end_string = "cus"
     __version = [1, 0, 1, 5]
     __browser = "1536|742|1536|864|0|0|0|0|1536|864|1536|864|1536|742|24|24|MacIntel"
-    __reg = [
-        1937774191,
-        1226093241,
-        388252375,
-        3666478592,
-        2842636476,
-        372324522,
-        3817729613,
-        2969243214,
-    ]
     __str = {
         "s0": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=",
         "s1": "Dkdpgh4ZKsQB80/Mfvw36XI1R25+WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe=",
@@ -51,13 +44,18 @@ class ABogus:
         "s3": "ckdp1h4ZKsUB80/Mfvw36XIgR25+WQAlEi7NLboqYTOPuzmFjJnryx9HVGDaStCe",
         "s4": "Dkdpgh2ZmsQB80/MfvV36XI1R45-WUAlEixNLwoqYTOPuzKFjJnry79HbGcaStCe",
     }
+    # 自定义字母表与标准 base64 字母表的映射，编码时直接 translate
+    __b64_tables = {k: bytes.maketrans(_B64_STANDARD, v[:64].encode()) for k, v in __str.items()}
 
     def __init__(self,
                  # user_agent: str = USERAGENT,
-                 platform: str = None, ):
-        self.chunk = []
-        self.size = 0
-        self.reg = self.__reg[:]
+                 platform: str = None,
+                 rng=None,
+                 clock=None, ):
+        # 随机数生成器与时钟可注入，便于复现签名结果
+        # Injectable RNG (random.Random-like) and clock (returns seconds) for reproducible output
+        self.rng = rng or _random
+        self.clock = clock or time
         # self.ua_code = self.generate_ua_code(user_agent)
         # Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36
         self.ua_code = [
@@ -94,9 +92,11 @@ class ABogus:
             138,
             252]
         self.browser = self.generate_browser_info(
-            platform) if platform else self.__browser
+            platform, self.rng) if platform else self.__browser
         self.browser_len = len(self.browser)
         self.browser_code = self.char_code_at(self.browser)
+        # 与请求参数无关的值只计算一次 (Values independent of the request are computed once)
+        self.__method_codes = {}
 
     @classmethod
     def list_1(cls, random_num=None, a=170, b=85, c=45, ) -> list:
@@ -144,7 +144,7 @@ class ABogus:
             f=0,
             g=0,
     ) -> list:
-        r = a or (random() * 10000)
+        r = a or (_random.random() * 10000)
         v = [
             r,
             int(r) & 255,
@@ -160,19 +160,14 @@ class ABogus:
         v.append(s)
         return v[-4:]
 
-    @staticmethod
-    def from_char_code(*args):
-        return "".join(chr(code) for code in args)
-
     @classmethod
     def generate_string_1(
             cls,
             random_num_1=None,
             random_num_2=None,
             random_num_3=None,
-    ):
-        return cls.from_char_code(*cls.list_1(random_num_1)) + cls.from_char_code(
-            *cls.list_2(random_num_2)) + cls.from_char_code(*cls.list_3(random_num_3))
+    ) -> bytes:
+        return bytes(cls.list_1(random_num_1) + cls.list_2(random_num_2) + cls.list_3(random_num_3))
 
     def generate_string_2(
             self,
@@ -180,7 +175,7 @@ class ABogus:
             method="GET",
             start_time=0,
             end_time=0,
-    ) -> str:
+    ) -> list[int]:
         a = self.generate_string_2_list(
             url_params,
             method,
@@ -190,7 +185,9 @@ class ABogus:
         e = self.end_check_num(a)
         a.extend(self.browser_code)
         a.append(e)
-        return self.rc4_encrypt(self.from_char_code(*a), "y")
+        cipher = self.rc4_encrypt(bytes(i & 255 for i in a), b"y")
+        # 时间戳高位会产生超过 255 的码位，RC4 只改变低 8 位，高位原样保留
+        return [c | (i & ~255) for c, i in zip(cipher, a)]
 
     def generate_string_2_list(
             self,
@@ -199,10 +196,12 @@ class ABogus:
             start_time=0,
             end_time=0,
     ) -> list:
-        start_time = start_time or int(time() * 1000)
-        end_time = end_time or (start_time + randint(4, 8))
+        start_time = start_time or int(self.clock() * 1000)
+        end_time = end_time or (start_time + self.rng.randint(4, 8))
         params_array = self.generate_params_code(url_params)
-        method_array = self.generate_method_code(method)
+        method_array = self.__method_codes.get(method)
+        if method_array is None:
+            method_array = self.__method_codes[method] = self.generate_method_code(method)
         return self.list_4(
             (end_time >> 24) & 255,
             params_array[21],
@@ -223,81 +222,6 @@ class ABogus:
             self.browser_len,
         )
 
-    @staticmethod
-    def reg_to_array(a):
-        o = [0] * 32
-        for i in range(8):
-            c = a[i]
-            o[4 * i + 3] = (255 & c)
-            c >>= 8
-            o[4 * i + 2] = (255 & c)
-            c >>= 8
-            o[4 * i + 1] = (255 & c)
-            c >>= 8
-            o[4 * i] = (255 & c)
-
-        return o
-
-    def compress(self, a):
-        f = self.generate_f(a)
-        i = self.reg[:]
-        for o in range(64):
-            c = self.de(i[0], 12) + i[4] + self.de(self.pe(o), o)
-            c = (c & 0xFFFFFFFF)
-            c = self.de(c, 7)
-            s = (c ^ self.de(i[0], 12)) & 0xFFFFFFFF
-
-            u = self.he(o, i[0], i[1], i[2])
-            u = (u + i[3] + s + f[o + 68]) & 0xFFFFFFFF
-
-            b = self.ve(o, i[4], i[5], i[6])
-            b = (b + i[7] + c + f[o]) & 0xFFFFFFFF
-
-            i[3] = i[2]
-            i[2] = self.de(i[1], 9)
-            i[1] = i[0]
-            i[0] = u
-
-            i[7] = i[6]
-            i[6] = self.de(i[5], 19)
-            i[5] = i[4]
-            i[4] = (b ^ self.de(b, 9) ^ self.de(b, 17)) & 0xFFFFFFFF
-
-        for l in range(8):
-            self.reg[l] = (self.reg[l] ^ i[l]) & 0xFFFFFFFF
-
-    @classmethod
-    def generate_f(cls, e):
-        r = [0] * 132
-
-        for t in range(16):
-            r[t] = (e[4 * t] << 24) | (e[4 * t + 1] <<
-                                       16) | (e[4 * t + 2] << 8) | e[4 * t + 3]
-            r[t] &= 0xFFFFFFFF
-
-        for n in range(16, 68):
-            a = r[n - 16] ^ r[n - 9] ^ cls.de(r[n - 3], 15)
-            a = a ^ cls.de(a, 15) ^ cls.de(a, 23)
-            r[n] = (a ^ cls.de(r[n - 13], 7) ^ r[n - 6]) & 0xFFFFFFFF
-
-        for n in range(68, 132):
-            r[n] = (r[n - 68] ^ r[n - 64]) & 0xFFFFFFFF
-
-        return r
-
-    @staticmethod
-    def pad_array(arr, length=60):
-        while len(arr) < length:
-            arr.append(0)
-        return arr
-
-    def fill(self, length=60):
-        size = 8 * self.size
-        self.chunk.append(128)
-        self.chunk = self.pad_array(self.chunk, length)
-        for i in range(4):
-            self.chunk.append((size >> 8 * (3 - i)) & 255)
-
     @staticmethod
     def list_4(
             a: int,
@@ -380,73 +304,15 @@ class ABogus:
     def replace_func(match):
         return chr(int(match.group(1), 16))
 
-    @staticmethod
-    def de(e, r):
-        r %= 32
-        return ((e << r) & 0xFFFFFFFF) | (e >> (32 - r))
-
-    @staticmethod
-    def pe(e):
-        return 2043430169 if 0 <= e < 16 else 2055708042
-
-    @staticmethod
-    def he(e, r, t, n):
-        if 0 <= e < 16:
-            return (r ^ t ^ n) & 0xFFFFFFFF
-        elif 16 <= e < 64:
-            return (r & t | r & n | t & n) & 0xFFFFFFFF
-        raise ValueError
-
-    @staticmethod
-    def ve(e, r, t, n):
-        if 0 <= e < 16:
-            return (r ^ t ^ n) & 0xFFFFFFFF
-        elif 16 <= e < 64:
-            return (r & t | ~r & n) & 0xFFFFFFFF
-        raise ValueError
-
-    @staticmethod
-    def convert_to_char_code(a):
-        d = []
-        for i in a:
-            d.append(ord(i))
-        return d
-
-    @staticmethod
-    def split_array(arr, chunk_size=64):
-        result = []
-        for i in range(0, len(arr), chunk_size):
-            result.append(arr[i:i + chunk_size])
-        return result
-
     @staticmethod
     def char_code_at(s):
         return [ord(char) for char in s]
 
-    def write(self, e, ):
-        self.size = len(e)
+    def sum(self, e, ):
         if isinstance(e, str):
             e = self.decode_string(e)
             e = self.char_code_at(e)
-        if len(e) <= 64:
-            self.chunk = e
-        else:
-            chunks = self.split_array(e, 64)
-            for i in chunks[:-1]:
-                self.compress(i)
-            self.chunk = chunks[-1]
-
-    def reset(self, ):
-        self.chunk = []
-        self.size = 0
-        self.reg = self.__reg[:]
-
-    def sum(self, e, length=60):
-        self.reset()
-        self.write(e)
-        self.fill(length)
-        self.compress(self.chunk)
-        return self.reg_to_array(self.reg)
+        return list(sm3_digest(bytes(e)))
 
     @classmethod
     def generate_result_unit(cls, n, s):
@@ -458,47 +324,32 @@ class ABogus:
     @classmethod
     def generate_result_end(cls, s, e="s4"):
         r = ""
-        b = ord(s[120]) << 16
+        b = (ord(s[120]) if isinstance(s, str) else s[120]) << 16
         r += cls.__str[e][(b & 16515072) >> 18]
         r += cls.__str[e][(b & 258048) >> 12]
         r += "=="
         return r
 
+    @staticmethod
+    def fold_code_points(codes) -> bytes:
+        """
+        原算法按字符码位做位运算，码位超过 255 时高位会并入同一组 (3 个字符) 中的前一个字符，
+        这里按相同规则折叠为字节序列
+        """
+        out = bytearray(c & 255 for c in codes)
+        for k, c in enumerate(codes):
+            if c > 255 and k % 3:
+                out[k - 1] |= (c >> 8) & 255
+        return bytes(out)
+
     @classmethod
-    def generate_result(cls, s, e="s4"):
-        # r = ""
-        # for i in range(len(s)//4):
-        #     b = ((ord(s[i * 3]) << 16) | (ord(s[i * 3 + 1]))
-        #          << 8) | ord(s[i * 3 + 2])
-        #     r += cls.generate_result_unit(b, e)
-        # return r
-
-        r = []
-
-        for i in range(0, len(s), 3):
-            if i + 2 < len(s):
-                n = (
-                    (ord(s[i]) << 16)
-                    | (ord(s[i + 1]) << 8)
-                    | ord(s[i + 2])
-                )
-            elif i + 1 < len(s):
-                n = (ord(s[i]) << 16) | (
-                    ord(s[i + 1]) << 8
-                )
-            else:
-                n = ord(s[i]) << 16
-
-            for j, k in zip(range(18, -1, -6),
-                            (0xFC0000, 0x03F000, 0x0FC0, 0x3F)):
-                if j == 6 and i + 1 >= len(s):
-                    break
-                if j == 0 and i + 2 >= len(s):
-                    break
-                r.append(cls.__str[e][(n & k) >> j])
-
-        r.append("=" * ((4 - len(r) % 4) % 4))
-        return "".join(r)
+    def generate_result(cls, s, e="s4") -> str:
+        # 等价于使用自定义字母表的 base64 编码
+        if isinstance(s, str):
+            s = [ord(c) for c in s]
+        if not isinstance(s, bytes):
+            s = cls.fold_code_points(s)
+        return b64encode(s).translate(cls.__b64_tables[e]).decode("ascii")
 
     @classmethod
     def generate_args_code(cls):
@@ -541,20 +392,18 @@ class ABogus:
         else:
             b = bytes(data)  # 将 List[int] 转换为字节数组
 
-        # 将字节数组转换为适合 sm3.sm3_hash 函数处理的列表格式
-        h = sm3.sm3_hash(func.bytes_to_list(b))
-
-        # 将十六进制字符串结果转换为十进制整数列表
-        return [int(h[i: i + 2], 16) for i in range(0, len(h), 2)]
+        # 后端优先使用 OpenSSL 的 SM3，不可用时使用纯 Python 实现
+        return list(sm3_digest(b))
 
     @classmethod
-    def generate_browser_info(cls, platform: str = "Win32") -> str:
-        inner_width = randint(1280, 1920)
-        inner_height = randint(720, 1080)
-        outer_width = randint(inner_width, 1920)
-        outer_height = randint(inner_height, 1080)
+    def generate_browser_info(cls, platform: str = "Win32", rng=None) -> str:
+        rng = rng or _random
+        inner_width = rng.randint(1280, 1920)
+        inner_height = rng.randint(720, 1080)
+        outer_width = rng.randint(inner_width, 1920)
+        outer_height = rng.randint(inner_height, 1080)
         screen_x = 0
-        screen_y = choice((0, 30))
+        screen_y = rng.choice((0, 30))
         value_list = [
             inner_width,
             inner_height,
@@ -577,26 +426,8 @@ class ABogus:
         return "|".join(str(i) for i in value_list)
 
     @staticmethod
-    def rc4_encrypt(plaintext, key):
-        s = list(range(256))
-        j = 0
-
-        for i in range(256):
-            j = (j + s[i] + ord(key[i % len(key)])) % 256
-            s[i], s[j] = s[j], s[i]
-
-        i = 0
-        j = 0
-        cipher = []
-
-        for k in range(len(plaintext)):
-            i = (i + 1) % 256
-            j = (j + s[i]) % 256
-            s[i], s[j] = s[j], s[i]
-            t = (s[i] + s[j]) % 256
-            cipher.append(chr(s[t] ^ ord(plaintext[k])))
-
-        return ''.join(cipher)
+    def rc4_encrypt(plaintext: bytes, key: bytes) -> bytes:
+        return xor_bytes(plaintext, rc4_keystream(key, len(plaintext)))
 
     def get_value(self,
                   url_params: dict | str,
@@ -608,13 +439,13 @@ class ABogus:
                   random_num_3=None,
                   ) -> str:
         string_1 = self.generate_string_1(
-            random_num_1,
-            random_num_2,
-            random_num_3,
+            random_num_1 or self.rng.random() * 10000,
+            random_num_2 or self.rng.random() * 10000,
+            random_num_3 or self.rng.random() * 10000,
         )
         string_2 = self.generate_string_2(urlencode(url_params) if isinstance(
             url_params, dict) else url_params, method, start_time, end_time, )
-        string = string_1 + string_2
+        string = list(string_1) + string_2
         # return self.generate_result(
         #     string, "s4") + self.generate_result_end(string, "s4")
         return self.generate_result(string, "s4")
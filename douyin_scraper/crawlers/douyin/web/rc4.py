@@ -0,0 +1,33 @@
+"""
+RC4 密钥流与异或 (RC4 keystream and XOR helpers)
+
+a_bogus 与 X-Bogus 都用固定密钥做 RC4 加密。RC4 没有 IV，密钥固定时密钥流也固定，
+按 (密钥, 长度) 缓存密钥流后，加密只需一次整数异或。
+(RC4 has no IV: cache the keystream per key/length and encrypt with a single XOR.)
+"""
+
+from functools import lru_cache
+
+__all__ = ["rc4_keystream", "xor_bytes", ]
+
+
+@lru_cache(maxsize=64)
+def rc4_keystream(key: bytes, length: int) -> bytes:
+    s = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (j + s[i] + key[i % len(key)]) & 255
+        s[i], s[j] = s[j], s[i]
+
+    i = j = 0
+    stream = bytearray(length)
+    for k in range(length):
+        i = (i + 1) & 255
+        j = (j + s[i]) & 255
+        s[i], s[j] = s[j], s[i]
+        stream[k] = s[(s[i] + s[j]) & 255]
+    return bytes(stream)
+
+
+def xor_bytes(data: bytes, stream: bytes) -> bytes:
+    return (int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")).to_bytes(len(data), "big")
@@ -0,0 +1,112 @@
+"""
+SM3 哈希后端 (SM3 hash backend)
+
+a_bogus 签名每次都要计算多轮 SM3。优先使用 OpenSSL 通过 hashlib 提供的 SM3，
+不可用时回退到基于 bytes/int 的纯 Python 实现。
+(Prefer OpenSSL's SM3 via hashlib, fall back to a pure-Python implementation on bytes/ints.)
+"""
+
+import hashlib
+from struct import pack, unpack
+
+__all__ = ["sm3_digest", "sm3_python", "sm3_openssl", "use_backend", "backend_name", ]
+
+_MASK = 0xFFFFFFFF
+_IV = (
+    0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600,
+    0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E,
+)
+
+
+def _rotl(x: int, n: int) -> int:
+    n %= 32
+    return ((x << n) & _MASK) | (x >> (32 - n))
+
+
+# 预先计算每一轮循环左移后的常量 T_j <<< j
+_T = tuple(_rotl(0x79CC4519 if j < 16 else 0x7A879D8A, j) for j in range(64))
+
+
+def _compress(v: tuple, block: bytes) -> tuple:
+    w = list(unpack(">16I", block))
+    for j in range(16, 68):
+        x = w[j - 16] ^ w[j - 9] ^ (((w[j - 3] << 15) & _MASK) | (w[j - 3] >> 17))
+        x ^= (((x << 15) & _MASK) | (x >> 17)) ^ (((x << 23) & _MASK) | (x >> 9))
+        y = w[j - 13]
+        w.append(x ^ (((y << 7) & _MASK) | (y >> 25)) ^ w[j - 6])
+
+    a, b, c, d, e, f, g, h = v
+    for j in range(64):
+        a12 = ((a << 12) & _MASK) | (a >> 20)
+        ss1 = (a12 + e + _T[j]) & _MASK
+        ss1 = ((ss1 << 7) & _MASK) | (ss1 >> 25)
+        if j < 16:
+            tt1 = ((a ^ b ^ c) + d + (ss1 ^ a12) + (w[j] ^ w[j + 4])) & _MASK
+            tt2 = ((e ^ f ^ g) + h + ss1 + w[j]) & _MASK
+        else:
+            tt1 = (((a & b) | (a & c) | (b & c)) + d + (ss1 ^ a12) + (w[j] ^ w[j + 4])) & _MASK
+            tt2 = (((e & f) | (~e & g)) + h + ss1 + w[j]) & _MASK
+        d = c
+        c = ((b << 9) & _MASK) | (b >> 23)
+        b = a
+        a = tt1
+        h = g
+        g = ((f << 19) & _MASK) | (f >> 13)
+        f = e
+        e = tt2 ^ (((tt2 << 9) & _MASK) | (tt2 >> 23)) ^ (((tt2 << 17) & _MASK) | (tt2 >> 15))
+
+    return (
+        v[0] ^ a, v[1] ^ b, v[2] ^ c, v[3] ^ d,
+        v[4] ^ e, v[5] ^ f, v[6] ^ g, v[7] ^ h,
+    )
+
+
+def sm3_python(data: bytes) -> bytes:
+    """纯 Python 实现的 SM3 (Pure-Python SM3)"""
+    length = len(data)
+    data = bytes(data) + b"\x80" + b"\x00" * ((55 - length) % 64) + pack(">Q", length * 8)
+    v = _IV
+    for i in range(0, len(data), 64):
+        v = _compress(v, data[i:i + 64])
+    return pack(">8I", *v)
+
+
+def sm3_openssl(data: bytes) -> bytes:
+    """OpenSSL 提供的 SM3 (SM3 provided by OpenSSL through hashlib)"""
+    return hashlib.new("sm3", data).digest()
+
+
+def _openssl_available() -> bool:
+    try:
+        return sm3_openssl(b"abc").hex() == "66c7f0f462eeedd9d1f2d46bdc10e4e24167c4875cf2f7a2297da02b8f4ba8e0"
+    except (ValueError, TypeError):
+        return False
+
+
+_BACKENDS = {"openssl": sm3_openssl, "python": sm3_python}
+_backend = "openssl" if _openssl_available() else "python"
+_digest = _BACKENDS[_backend]
+
+
+def use_backend(name: str) -> None:
+    """
+    切换 SM3 后端 (Switch SM3 backend)
+
+    Args:
+        name (str): "openssl" 或 "python"
+    """
+    global _backend, _digest
+    if name not in _BACKENDS:
+        raise ValueError("未知的SM3后端：{0}".format(name))
+    if name == "openssl" and not _openssl_available():
+        raise RuntimeError("当前 OpenSSL 不支持 SM3")
+    _backend, _digest = name, _BACKENDS[name]
+
+
+def backend_name() -> str:
+    return _backend
+
+
+def sm3_digest(data: bytes) -> bytes:
+    """计算 SM3 摘要，返回 32 字节 (Compute the 32-byte SM3 digest)"""
+    return _digest(data)
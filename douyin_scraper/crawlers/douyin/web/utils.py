@@ -38,14 +38,14 @@ import random
 import re
 import time
 import urllib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
 from urllib.parse import urlencode, quote
 
 # import execjs
 import httpx
-import qrcode
-import yaml
 
 from .xbogus import XBogus as XB
 from .abogus import ABogus as AB
@@ -70,20 +70,48 @@ from ...utils.utils import (
 # Read the configuration file
 path = os.path.abspath(os.path.dirname(__file__))
 
-# 读取配置文件
-with open(f"{path}/config.yaml", "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
+
+@lru_cache(maxsize=None)
+def load_config() -> dict:
+    """
+    首次使用时才读取配置文件 (Read the configuration file on first use)
+    """
+    import yaml
+
+    with open(f"{path}/config.yaml", "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+class _LazyConf:
+    """
+    首次访问时从配置文件取值并缓存为普通类属性
+    (Resolve a class attribute from the config file on first access, then cache it)
+    """
+
+    def __init__(self, getter):
+        self.getter = getter
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner):
+        value = self.getter(load_config())
+        setattr(owner, self.name, value)
+        return value
 
 
 class TokenManager:
-    douyin_manager = config.get("TokenManager").get("douyin")
-    token_conf = douyin_manager.get("msToken", None)
-    ttwid_conf = douyin_manager.get("ttwid", None)
-    proxies_conf = douyin_manager.get("proxies", None)
-    proxies = {
-        "http://": proxies_conf.get("http", None),
-        "https://": proxies_conf.get("https", None),
-    }
+    douyin_manager = _LazyConf(lambda conf: conf.get("TokenManager").get("douyin"))
+    token_conf = _LazyConf(lambda conf: TokenManager.douyin_manager.get("msToken", None))
+    ttwid_conf = _LazyConf(lambda conf: TokenManager.douyin_manager.get("ttwid", None))
+    proxies_conf = _LazyConf(lambda conf: TokenManager.douyin_manager.get("proxies", None))
+    proxies = _LazyConf(lambda conf: {
+        "http://": TokenManager.proxies_conf.get("http", None),
+        "https://": TokenManager.proxies_conf.get("https", None),
+    })
+    # 宿主注入的代理池 (需提供 pick(url) 与 report(proxy, url, ok, latency=None))，为 None 时使用上面的 proxies
+    # (Proxy pool injected by the host; falls back to the proxies above when None)
+    pool = None
 
     @classmethod
     def gen_real_msToken(cls) -> str:
@@ -196,6 +224,170 @@ class TokenManager:
                     )
                     )
 
+    @classmethod
+    def _async_transport_mounts(cls, retries: int) -> dict:
+        # httpx 新版本移除了 proxies 参数，这里按协议挂载带代理的传输层
+        # (Newer httpx dropped `proxies`, so mount a proxied transport per scheme)
+        return {
+            scheme: httpx.AsyncHTTPTransport(retries=retries, proxy=proxy)
+            for scheme, proxy in cls.proxies.items() if proxy
+        }
+
+    @classmethod
+    async def request(cls, method: str, url: str, timeout: float, retries: int = 2, **kwargs) -> httpx.Response:
+        """
+        发送一次异步请求：注入了代理池时由其挑选代理并回报结果，否则按配置文件挂载代理
+        (Send a request through the injected proxy pool, or the configured proxies when there is none)
+        """
+        proxy = cls.pool.pick(url) if cls.pool else None
+        if proxy:
+            mounts = {"all://": httpx.AsyncHTTPTransport(retries=retries, proxy=httpx.Proxy(proxy.url))}
+        else:
+            mounts = cls._async_transport_mounts(retries) if cls.pool is None else None
+        start = time.monotonic()
+        async with httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(retries=retries), mounts=mounts, timeout=timeout
+        ) as client:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if cls.pool: cls.pool.report(proxy, url, False)
+                raise
+        if cls.pool: cls.pool.report(proxy, url, True, time.monotonic() - start)
+        return response
+
+    @classmethod
+    async def gen_real_msToken_async(cls, timeout: float = 10) -> str:
+        """
+        异步生成真实的msToken，失败时抛出异常，由调用方决定是否回退
+        (Generate a real msToken asynchronously, raising on failure so the caller can fall back)
+        """
+
+        payload = json.dumps(
+            {
+                "magic": cls.token_conf["magic"],
+                "version": cls.token_conf["version"],
+                "dataType": cls.token_conf["dataType"],
+                "strData": cls.token_conf["strData"],
+                "tspFromClient": get_timestamp(),
+            }
+        )
+        headers = {
+            "User-Agent": cls.token_conf["User-Agent"],
+            "Content-Type": "application/json",
+        }
+
+        response = await cls.request("POST", cls.token_conf["url"], timeout, content=payload, headers=headers)
+        response.raise_for_status()
+
+        msToken = response.cookies.get("msToken") or ""
+        if len(msToken) not in [120, 128]:
+            raise APIResponseError("响应内容：{0}， Douyin msToken API 的响应内容不符合要求。".format(msToken))
+        return msToken
+
+    @classmethod
+    async def gen_ttwid_async(cls, timeout: float = 10) -> str:
+        """
+        异步生成请求必带的ttwid (Generate the essential ttwid asynchronously)
+        """
+
+        try:
+            response = await cls.request("POST", cls.ttwid_conf["url"], timeout, content=cls.ttwid_conf["data"])
+            response.raise_for_status()
+        except httpx.RequestError as exc:
+            raise APIConnectionError(
+                "请求端点失败，请检查当前网络环境。 链接：{0}，代理：{1}，异常类名：{2}，异常详细信息：{3}"
+                .format(cls.ttwid_conf["url"], cls.proxies, cls.__name__, exc)
+            )
+        except httpx.HTTPStatusError as e:
+            raise APIResponseError("链接：{0}，状态码 {1}：{2} ".format(
+                e.response.url, e.response.status_code, e.response.text
+            ))
+
+        ttwid = response.cookies.get("ttwid")
+        if not ttwid:
+            raise APIResponseError("ttwid 接口未返回 ttwid Cookie")
+        return ttwid
+
+
+class TokenService:
+    """
+    msToken / ttwid 的异步缓存服务 (Async cache for msToken / ttwid)
+
+    后台任务在令牌过期前提前刷新，请求时只读缓存，不额外增加延迟；
+    msToken 刷新失败或尚未就绪时回退为本地生成的虚假值。
+    (A background task refreshes tokens ahead of expiry; requests only read the cache.)
+    """
+
+    # 有效期与提前刷新时间 (秒) (Lifetimes and refresh lead time, in seconds)
+    TTL = {"msToken": 3600, "ttwid": 86400}
+    refresh_ahead = 300
+    retry_interval = 60
+    timeout = 10
+
+    _tokens = {}
+    _task = None
+
+    @classmethod
+    def start(cls) -> None:
+        """在当前事件循环中启动后台刷新任务 (Start the background refresh task on the running loop)"""
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.get_running_loop().create_task(cls._refresh_loop())
+
+    @classmethod
+    def stop(cls) -> None:
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+
+    @classmethod
+    def get(cls, name: str) -> Union[str, None]:
+        """读取未过期的缓存令牌，没有则返回 None (Return a cached, unexpired token or None)"""
+        entry = cls._tokens.get(name)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        # 缓存为空时顺带拉起刷新任务，适用于未显式 start 的场景
+        try:
+            cls.start()
+        except RuntimeError:
+            pass
+        return None
+
+    @classmethod
+    def ms_token(cls) -> str:
+        return cls.get("msToken") or TokenManager.gen_false_msToken()
+
+    @classmethod
+    def ttwid(cls) -> Union[str, None]:
+        return cls.get("ttwid")
+
+    @classmethod
+    async def refresh(cls, name: str) -> bool:
+        """立即刷新一个令牌，失败时保留旧值直到其过期 (Refresh one token now, keeping the old value on failure)"""
+        fetch = TokenManager.gen_real_msToken_async if name == "msToken" else TokenManager.gen_ttwid_async
+        try:
+            value = await fetch(timeout=cls.timeout)
+        except Exception as e:
+            logger.warning("刷新{0}失败：{1}".format(name, e))
+            return False
+        cls._tokens[name] = (value, time.time() + cls.TTL[name])
+        return True
+
+    @classmethod
+    async def _refresh_loop(cls) -> None:
+        while True:
+            delays = []
+            for name, ttl in cls.TTL.items():
+                ahead = min(cls.refresh_ahead, ttl / 2)
+                entry = cls._tokens.get(name)
+                if entry is None or entry[1] - ahead <= time.time():
+                    if not await cls.refresh(name):
+                        delays.append(cls.retry_interval)
+                        continue
+                    entry = cls._tokens[name]
+                delays.append(entry[1] - ahead - time.time())
+            await asyncio.sleep(max(1.0, min(delays)))
+
 
 class VerifyFpManager:
     @classmethod
@@ -234,12 +426,71 @@ class VerifyFpManager:
 
 
 class BogusManager:
+    # 签名上下文缓存：X-Bogus 按 User-Agent，A-Bogus 按平台 (ua_code 固定对应默认 User-Agent)
+    # Signing contexts are precomputed once and reused across requests
+    _xb_contexts = {}
+    _ab_contexts = {}
+
+    # 批量签名的执行方式 (Execution mode for batch signing):
+    # inline 在当前线程执行，thread / process 分别交给线程池 / 进程池，避免阻塞事件循环
+    SIGN_MODES = ("inline", "thread", "process")
+    sign_mode = "inline"
+    sign_workers = None
+    _executor = None
+
+    @classmethod
+    def configure(cls, mode: str = "inline", workers: int = None) -> None:
+        """
+        设置批量签名的执行方式 (Configure how batch signing is executed)
+
+        Args:
+            mode (str): inline / thread / process
+            workers (int): 线程池或进程池的大小，None 表示使用默认值 (Pool size, None for default)
+        """
+        if mode not in cls.SIGN_MODES:
+            raise ValueError("未知的签名模式：{0}，可选：{1}".format(mode, "/".join(cls.SIGN_MODES)))
+        if mode != cls.sign_mode or workers != cls.sign_workers:
+            cls.shutdown()
+        cls.sign_mode = mode
+        cls.sign_workers = workers or None
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            if cls.sign_mode == "process":
+                cls._executor = ProcessPoolExecutor(max_workers=cls.sign_workers)
+            else:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=cls.sign_workers, thread_name_prefix="bogus-sign"
+                )
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """关闭签名线程池/进程池 (Shut down the signing pool)"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def xb_context(cls, user_agent: str) -> XB:
+        context = cls._xb_contexts.get(user_agent)
+        if context is None:
+            context = cls._xb_contexts[user_agent] = XB(user_agent)
+        return context
+
+    @classmethod
+    def ab_context(cls, platform: str = None) -> AB:
+        context = cls._ab_contexts.get(platform)
+        if context is None:
+            context = cls._ab_contexts[platform] = AB(platform)
+        return context
 
     # 字符串方法生成X-Bogus参数
     @classmethod
     def xb_str_2_endpoint(cls, endpoint: str, user_agent: str) -> str:
         try:
-            final_endpoint = XB(user_agent).getXBogus(endpoint)
+            final_endpoint = cls.xb_context(user_agent).getXBogus(endpoint)
         except Exception as e:
             raise RuntimeError("生成X-Bogus失败: {0})".format(e))
 
@@ -254,7 +505,7 @@ class BogusManager:
         param_str = "&".join([f"{k}={v}" for k, v in params.items()])
 
         try:
-            xb_value = XB(user_agent).getXBogus(param_str)
+            xb_value = cls.xb_context(user_agent).getXBogus(param_str)
         except Exception as e:
             raise RuntimeError("生成X-Bogus失败: {0})".format(e))
 
@@ -297,12 +548,52 @@ class BogusManager:
             raise TypeError("参数必须是字典类型")
 
         try:
-            ab_value = AB().get_value(params, )
+            ab_value = cls.ab_context().get_value(params, )
         except Exception as e:
             raise RuntimeError("生成A-Bogus失败: {0})".format(e))
 
         return quote(ab_value, safe='')
 
+    # 批量生成A-Bogus参数，结果顺序与输入一致
+    @classmethod
+    async def ab_models_2_endpoints(cls, params_list: list, user_agent: str) -> list:
+        """
+        批量生成A-Bogus参数 (Generate A-Bogus values for many param dicts at once)
+
+        Args:
+            params_list (list): 请求参数字典列表 (List of request param dicts)
+            user_agent (str): 请求使用的User-Agent (User-Agent of the requests)
+
+        Returns:
+            list: 与输入顺序一致的A-Bogus值 (A-Bogus values in input order)
+        """
+        if not isinstance(params_list, list):
+            raise TypeError("参数必须是列表类型")
+        if not params_list:
+            return []
+
+        # 单个签名不到 1 毫秒，交给线程池/进程池的调度与序列化开销反而更大，直接计算
+        # (A single signature is cheaper than the executor round trip, sign it inline)
+        if cls.sign_mode == "inline" or len(params_list) == 1:
+            return [cls.ab_model_2_endpoint(params, user_agent) for params in params_list]
+
+        # 按池大小切块，减少跨线程/进程的调度次数
+        executor = cls.get_executor()
+        workers = cls.sign_workers or os.cpu_count() or 1
+        size = -(-len(params_list) // workers)
+        chunks = [params_list[i:i + size] for i in range(0, len(params_list), size)]
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *[loop.run_in_executor(executor, _sign_ab_chunk, chunk, user_agent) for chunk in chunks]
+        )
+        return [value for chunk in results for value in chunk]
+
+
+def _sign_ab_chunk(params_list: list, user_agent: str) -> list:
+    # 进程池中执行的函数必须位于模块顶层才能被 pickle
+    return [BogusManager.ab_model_2_endpoint(params, user_agent) for params in params_list]
+
 
 class SecUserIdFetcher:
     # 预编译正则表达式
@@ -425,39 +716,40 @@ class AwemeIdFetcher:
         if not isinstance(url, str):
             raise TypeError("参数必须是字符串类型")
 
-        # 重定向到完整链接
-        transport = httpx.AsyncHTTPTransport(retries=5)
-        async with httpx.AsyncClient(
-                transport=transport, proxy=None, timeout=10
-        ) as client:
-            try:
-                response = await client.get(url, follow_redirects=True)
-                response.raise_for_status()
-
-                response_url = str(response.url)
-
-                # 按顺序尝试匹配视频ID
-                for pattern in [
-                    cls._DOUYIN_VIDEO_URL_PATTERN,
-                    cls._DOUYIN_VIDEO_URL_PATTERN_NEW,
-                    cls._DOUYIN_NOTE_URL_PATTERN,
-                    cls._DOUYIN_DISCOVER_URL_PATTERN
-                ]:
-                    match = pattern.search(response_url)
-                    if match:
-                        return match.group(1)
+        # 长链接本身已包含作品 ID，无需再请求一次跟随重定向
+        # (Full links already carry the id, skip the redirect round trip)
+        for pattern in (cls._DOUYIN_VIDEO_URL_PATTERN, cls._DOUYIN_NOTE_URL_PATTERN):
+            match = pattern.search(url)
+            if match and match.group(1).isdigit():
+                return match.group(1)
 
-                raise APIResponseError("未在响应的地址中找到 aweme_id，检查链接是否为作品页")
+        # 重定向到完整链接
+        try:
+            response = await TokenManager.request("GET", url, 10, retries=5, follow_redirects=True)
+            response.raise_for_status()
+        except httpx.RequestError as exc:
+            raise APIConnectionError(
+                f"请求端点失败，请检查当前网络环境。链接：{url}，代理：{TokenManager.proxies}，异常类名：{cls.__name__}，异常详细信息：{exc}"
+            )
+        except httpx.HTTPStatusError as e:
+            raise APIResponseError(
+                f"链接：{e.response.url}，状态码 {e.response.status_code}：{e.response.text}"
+            )
 
-            except httpx.RequestError as exc:
-                raise APIConnectionError(
-                    f"请求端点失败，请检查当前网络环境。链接：{url}，代理：{TokenManager.proxies}，异常类名：{cls.__name__}，异常详细信息：{exc}"
-                )
+        response_url = str(response.url)
+
+        # 按顺序尝试匹配视频ID
+        for pattern in [
+            cls._DOUYIN_VIDEO_URL_PATTERN,
+            cls._DOUYIN_VIDEO_URL_PATTERN_NEW,
+            cls._DOUYIN_NOTE_URL_PATTERN,
+            cls._DOUYIN_DISCOVER_URL_PATTERN
+        ]:
+            match = pattern.search(response_url)
+            if match:
+                return match.group(1)
 
-            except httpx.HTTPStatusError as e:
-                raise APIResponseError(
-                    f"链接：{e.response.url}，状态码 {e.response.status_code}：{e.response.text}"
-                )
+        raise APIResponseError("未在响应的地址中找到 aweme_id，检查链接是否为作品页")
 
     @classmethod
     async def get_all_aweme_id(cls, urls: list) -> list:
@@ -744,6 +1036,8 @@ def show_qrcode(qrcode_url: str, show_image: bool = False) -> None:
         show_image (bool): 是否显示图像，True 表示显示，False 表示在控制台显示
         (Whether to display the image, True means display, False means display in the console)
     """
+    import qrcode
+
     if show_image:
         # 创建并显示QR码图像
         qr_code_img = qrcode.make(qrcode_url)
@@ -37,9 +37,13 @@ import time
 import base64
 import hashlib
 
+from .rc4 import rc4_keystream, xor_bytes
+
+_B64_STANDARD = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
 
 class XBogus:
-    def __init__(self, user_agent: str = None) -> None:
+    def __init__(self, user_agent: str = None, clock=None) -> None:
         # fmt: off
         self.Array = [
             None, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None,
@@ -57,6 +61,17 @@ class XBogus:
             if user_agent is not None and user_agent != ""
             else "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
         )
+        # 时钟可注入，便于复现签名结果 (Injectable clock for reproducible output)
+        self.clock = clock or time.time
+        # 与 URL 无关的值在初始化时计算一次
+        # Values independent of the URL are computed once per User-Agent
+        self.table = bytes.maketrans(_B64_STANDARD, self.character[:64].encode())
+        self.ua_array = self.md5_bytes(
+            base64.b64encode(
+                self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
+            )
+        )
+        self.empty_array = self.md5_bytes(bytes.fromhex("d41d8cd98f00b204e9800998ecf8427e"))
 
     def md5_str_to_array(self, md5_str):
         """
@@ -76,15 +91,20 @@ class XBogus:
                 idx += 2
             return array
 
+    @staticmethod
+    def md5_bytes(data: bytes) -> bytes:
+        """
+        计算md5摘要并以字节形式返回。
+        Calculate the md5 digest as bytes.
+        """
+        return hashlib.md5(data).digest()
+
     def md5_encrypt(self, url_path):
         """
         使用多轮md5哈希算法对URL路径进行加密。
         Encrypt the URL path using multiple rounds of md5 hashing.
         """
-        hashed_url_path = self.md5_str_to_array(
-            self.md5(self.md5_str_to_array(self.md5(url_path)))
-        )
-        return hashed_url_path
+        return self.md5_bytes(self.md5_bytes(bytes(self.md5_str_to_array(url_path))))
 
     def md5(self, input_data):
         """
@@ -109,45 +129,21 @@ class XBogus:
         第一次编码转换。
         Perform encoding conversion.
         """
-        y = [a]
-        y.append(int(i))
-        y.extend([b, _, c, x, e, u, d, s, t, l, f, v, r, h, n, p, o])
-        re = bytes(y).decode("ISO-8859-1")
-        return re
+        return bytes((a, int(i), b, _, c, x, e, u, d, s, t, l, f, v, r, h, n, p, o))
 
     def encoding_conversion2(self, a, b, c):
         """
         第二次编码转换。
         Perform an encoding conversion on the given input values and return the result.
         """
-        return chr(a) + chr(b) + c
+        return bytes((a, b)) + c
 
     def rc4_encrypt(self, key, data):
         """
         使用RC4算法对数据进行加密。
         Encrypt data using the RC4 algorithm.
         """
-        S = list(range(256))
-        j = 0
-        encrypted_data = bytearray()
-
-        # 初始化 S 盒
-        # Initialize the S box
-        for i in range(256):
-            j = (j + S[i] + key[i % len(key)]) % 256
-            S[i], S[j] = S[j], S[i]
-
-        # 生成密文
-        # Generate the ciphertext
-        i = j = 0
-        for byte in data:
-            i = (i + 1) % 256
-            j = (j + S[i]) % 256
-            S[i], S[j] = S[j], S[i]
-            encrypted_byte = byte ^ S[(S[i] + S[j]) % 256]
-            encrypted_data.append(encrypted_byte)
-
-        return encrypted_data
+        return bytearray(xor_bytes(bytes(data), rc4_keystream(bytes(key), len(data))))
 
     def calculation(self, a1, a2, a3):
         """
@@ -170,24 +166,12 @@ class XBogus:
         Get the X-Bogus value.
         """
 
-        array1 = self.md5_str_to_array(
-            self.md5(
-                base64.b64encode(
-                    self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
-                ).decode("ISO-8859-1")
-            )
-        )
-
-        array2 = self.md5_str_to_array(
-            self.md5(self.md5_str_to_array("d41d8cd98f00b204e9800998ecf8427e"))
-        )
+        array1 = self.ua_array
+        array2 = self.empty_array
         url_path_array = self.md5_encrypt(url_path)
 
-        timer = int(time.time())
+        timer = int(self.clock())
         ct = 536919696
-        array3 = []
-        array4 = []
-        xb_ = ""
         # fmt: off
         new_array = [
             64, 0.00390625, 1, 12,
@@ -205,37 +189,20 @@ class XBogus:
 
         new_array.append(xor_result)
 
-        idx = 0
-        while idx < len(new_array):
-            array3.append(new_array[idx])
-            try:
-                array4.append(new_array[idx + 1])
-            except IndexError:
-                pass
-            idx += 2
-
-        merge_array = array3 + array4
+        merge_array = new_array[0::2] + new_array[1::2]
 
         garbled_code = self.encoding_conversion2(
             2,
             255,
-            self.rc4_encrypt(
-                "ÿ".encode("ISO-8859-1"),
-                self.encoding_conversion(*merge_array).encode("ISO-8859-1"),
-            ).decode("ISO-8859-1"),
+            self.rc4_encrypt(b"\xff", self.encoding_conversion(*merge_array)),
         )
 
-        idx = 0
-        while idx < len(garbled_code):
-            xb_ += self.calculation(
-                ord(garbled_code[idx]),
-                ord(garbled_code[idx + 1]),
-                ord(garbled_code[idx + 2]),
-            )
-            idx += 3
-        self.params = "%s&X-Bogus=%s" % (url_path, xb_)
+        # 3 字节一组按自定义字母表编码，等价于 base64 换表
+        xb_ = base64.b64encode(garbled_code).translate(self.table).decode("ascii")
+        params = "%s&X-Bogus=%s" % (url_path, xb_)
+        self.params = params
         self.xb = xb_
-        return (self.params, self.xb, self.user_agent)
+        return (params, xb_, self.user_agent)
 
 
 if __name__ == "__main__":
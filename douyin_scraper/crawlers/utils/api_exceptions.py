@@ -32,15 +32,15 @@
 #
 # ==============================================================================
 
+from .logger import logger
+
 
 class APIError(Exception):
     """基本API异常类，其他API异常都会继承这个类"""
 
     def __init__(self, status_code=None):
         self.status_code = status_code
-        print(
-            "程序出现异常，请检查错误信息。"
-        )
+        logger.debug("程序出现异常，请检查错误信息。")
 
     def display_error(self):
         """显示错误信息和状态码（如果有的话）"""
@@ -35,12 +35,12 @@
 
 import threading
 import time
+import queue
 import logging
 import datetime
 
 from pathlib import Path
-from rich.logging import RichHandler
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
 
 
 class Singleton(type):
@@ -74,7 +74,44 @@ class Singleton(type):
                 del cls._instances[key]
 
 
+class DroppingQueueHandler(QueueHandler):
+    """
+    只把日志记录放入队列，由后台线程写终端/文件；积压超过 capacity 时丢弃并计数，
+    写日志永远不会阻塞调用方
+    (Enqueue-only handler: drops and counts records once the backlog exceeds capacity)
+    """
+
+    def __init__(self, capacity: int):
+        # 队列本身不设上限，QueueListener 停止时放入的结束标记不会因队列已满而失败
+        super().__init__(queue.Queue())
+        self.capacity = capacity
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.capacity:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class ForwardHandler(logging.Handler):
+    """
+    在日志后台线程中把记录交给目标 logger 的处理器 (如宿主程序的根 logger)
+    (Hands records to another logger's handlers from the listener thread)
+    """
+
+    def __init__(self, target: logging.Logger):
+        super().__init__()
+        self.target = target
+
+    def emit(self, record):
+        self.target.callHandlers(record)
+
+
 class LogManager(metaclass=Singleton):
+    # 日志队列最多积压的记录数 (Max records waiting for the background writer)
+    QUEUE_SIZE = 10000
+
     def __init__(self):
         if getattr(self, "_initialized", False):  # 防止重复初始化
             return
@@ -82,13 +119,19 @@ class LogManager(metaclass=Singleton):
         self.logger = logging.getLogger("Douyin_TikTok_Download_API_Crawlers")
         self.logger.setLevel(logging.INFO)
         self.log_dir = None
+        self.queue_handler = None
+        self.listener = None
         self._initialized = True
 
-    def setup_logging(self, level=logging.INFO, log_to_console=False, log_path=None):
+    def setup_logging(self, level=logging.INFO, log_to_console=False, log_path=None, queue_size=QUEUE_SIZE):
+        self._stop_listener()
         self.logger.handlers.clear()
         self.logger.setLevel(level)
+        handlers = []
 
         if log_to_console:
+            from rich.logging import RichHandler
+
             ch = RichHandler(
                 show_time=False,
                 show_path=False,
@@ -97,7 +140,7 @@ class LogManager(metaclass=Singleton):
                 rich_tracebacks=True,
             )
             ch.setFormatter(logging.Formatter("{message}", style="{", datefmt="[%X]"))
-            self.logger.addHandler(ch)
+            handlers.append(ch)
 
         if log_path:
             self.log_dir = Path(log_path)
@@ -112,7 +155,58 @@ class LogManager(metaclass=Singleton):
                     "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
                 )
             )
-            self.logger.addHandler(fh)
+            handlers.append(fh)
+
+        if handlers:
+            self._start_listener(handlers, queue_size)
+
+    def forward_to(self, target: logging.Logger = None, queue_size=QUEUE_SIZE):
+        """
+        作为插件运行时使用：记录不再同步传播给宿主的处理器，而是经有界队列由后台线程转交给
+        target (默认根 logger) 的处理器，日志级别沿用宿主的设置
+        (Plugin mode: forward records to the host's handlers from the listener thread)
+        """
+        self._stop_listener()
+        self.logger.handlers.clear()
+        self.logger.setLevel(logging.NOTSET)
+        self._start_listener([ForwardHandler(target or logging.getLogger())], queue_size)
+        self.logger.propagate = False
+
+    def detach(self):
+        """停止转发并恢复同步传播 (Stop forwarding and propagate synchronously again)"""
+        self._stop_listener()
+        self.logger.handlers.clear()
+        self.logger.propagate = True
+
+    def _start_listener(self, handlers, queue_size):
+        # 终端/文件/宿主处理器的 I/O 交给后台线程，调用方只把记录放入有界队列
+        # (Handler I/O runs on a background thread; callers only enqueue)
+        self.queue_handler = DroppingQueueHandler(queue_size)
+        self.listener = QueueListener(self.queue_handler.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        self.logger.addHandler(self.queue_handler)
+
+    @property
+    def dropped(self) -> int:
+        """队列积压时丢弃的日志条数 (Records dropped because the queue was full)"""
+        return self.queue_handler.dropped if self.queue_handler else 0
+
+    def _stop_listener(self):
+        if self.listener is None:
+            return
+        # stop() 会先写完队列中剩余的记录 (stop() drains the queue first)
+        self.listener.stop()
+        dropped = self.queue_handler.dropped
+        if dropped:
+            record = self.logger.makeRecord(
+                self.logger.name, logging.WARNING, __file__, 0,
+                "日志队列已满，共丢弃 {0} 条日志".format(dropped), None, None
+            )
+        for handler in self.listener.handlers:
+            if dropped:
+                handler.handle(record)
+            handler.close()
+        self.listener = None
 
     @staticmethod
     def ensure_log_dir_exists(log_path: Path):
@@ -137,6 +231,7 @@ class LogManager(metaclass=Singleton):
                 )
 
     def shutdown(self):
+        self._stop_listener()
         for handler in self.logger.handlers:
             handler.close()
             self.logger.removeHandler(handler)
@@ -166,4 +261,7 @@ def log_setup(log_to_console=True):
     return logger
 
 
-logger = log_setup()
+# 导入时不创建日志目录、不挂载处理器，日志交由宿主程序的根 logger 输出；
+# 独立运行时可调用 log_setup() 启用控制台与文件日志
+# (No handlers or log directory at import time; call log_setup() when running standalone)
+logger = logging.getLogger("Douyin_TikTok_Download_API_Crawlers")
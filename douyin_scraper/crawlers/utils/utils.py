@@ -36,29 +36,21 @@
 import re
 import sys
 import random
-import secrets
 import datetime
-import browser_cookie3
-import importlib_resources
-
-from pydantic import BaseModel
 
 from urllib.parse import quote, urlencode  # URL编码
-from typing import Union, List, Any
+from typing import TYPE_CHECKING, Union, List, Any
 from pathlib import Path
 
-# 生成一个 16 字节的随机字节串 (Generate a random byte string of 16 bytes)
-seed_bytes = secrets.token_bytes(16)
-
-# 将字节字符串转换为整数 (Convert the byte string to an integer)
-seed_int = int.from_bytes(seed_bytes, "big")
-
-# 设置随机种子 (Seed the random module)
-random.seed(seed_int)
+# browser_cookie3 / importlib_resources / pydantic 只在个别函数中用到，在函数内按需导入
+# (Heavy optional dependencies are imported inside the functions that need them)
+# random 模块在解释器启动时已由 os.urandom 播种，这里不再重新设置全局种子
+if TYPE_CHECKING:
+    from pydantic import BaseModel
 
 
 # 将模型实例转换为字典
-def model_to_query_string(model: BaseModel) -> str:
+def model_to_query_string(model: "BaseModel") -> str:
     model_dict = model.dict()
     # 使用urlencode进行URL编码
     query_string = urlencode(model_dict)
@@ -221,6 +213,8 @@ def get_resource_path(filepath: str):
         filepath: str: 文件路径 (file path)
     """
 
+    import importlib_resources
+
     return importlib_resources.files("f2") / filepath
 
 
@@ -300,6 +294,8 @@ def get_cookie_from_browser(browser_choice: str, domain: str = "") -> dict:
     if not browser_choice or not domain:
         return ""
 
+    import browser_cookie3
+
     BROWSER_FUNCTIONS = {
         "chrome": browser_cookie3.chrome,
         "firefox": browser_cookie3.firefox,
@@ -1,19 +1,110 @@
 import asyncio
 import json
 import re
+import time
 import httpx
+from contextlib import nullcontext
 from urllib.parse import urlencode
-from .crawlers.douyin.web.utils import AwemeIdFetcher, BogusManager
+from .crawlers.douyin.web.utils import AwemeIdFetcher, BogusManager, TokenManager, TokenService
 from .crawlers.douyin.web.endpoints import DouyinAPIEndpoints
+from .crawlers.utils.logger import logger
 from .cookie_extractor import extract_and_format_cookies
 
+VIDEO_CODECS = ("h264", "h265")
+
+
+class EmptyResponseError(ValueError):
+    """详情接口返回空响应体，通常是限流或 Cookie 被风控"""
+
+
+def is_throttled(exc: Exception) -> bool:
+    """按异常类型与 HTTP 状态码判断是否为限流信号 (不匹配错误文本，其中含有带签名的请求地址)"""
+    if isinstance(exc, EmptyResponseError): return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+
+
+def _variant_size(entry: dict, duration_ms: int) -> int:
+    """返回清晰度条目的字节数；缺少 data_size 时按码率和时长估算，无法估算时返回 0"""
+    size = entry.get("play_addr", {}).get("data_size") or 0
+    if not size and entry.get("bit_rate") and duration_ms:
+        size = entry["bit_rate"] * duration_ms // 8000
+    return size
+
+
+def select_video_entry(video: dict, max_bytes: int = 0, codec: str = "h264") -> dict:
+    """
+    挑选视频清晰度，返回该条目 (含 play_addr)。未设置预算时使用抖音默认的 play_addr，
+    设置了预算或 play_addr 不可用时从 video.bit_rate 中挑选。
+
+    Args:
+        video: aweme_detail 中的 video 字段。
+        max_bytes: 字节预算，0 表示不限制。预算内优先首选编码，再取分辨率和码率最高的；
+            全部超出预算时取体积最小的。
+        codec: 首选编码，h264 兼容性好，h265 体积小；只在挑选 bit_rate 条目时生效。
+    """
+    default = {"play_addr": video.get("play_addr") or {}}
+    if not max_bytes and default["play_addr"].get("url_list"):
+        return default
+    duration_ms = video.get("duration") or 0
+    variants = [e for e in video.get("bit_rate") or [] if e.get("play_addr", {}).get("url_list")]
+    if not variants:
+        return default
+
+    want_h265 = codec == "h265"
+
+    def rank(entry):
+        addr = entry["play_addr"]
+        is_h265 = bool(entry.get("is_h265") or entry.get("is_bytevc1"))
+        return (is_h265 == want_h265, (addr.get("width") or 0) * (addr.get("height") or 0), entry.get("bit_rate") or 0)
+
+    fitting = [e for e in variants if not max_bytes or _variant_size(e, duration_ms) <= max_bytes]
+    if fitting:
+        best = max(fitting, key=rank)
+    else:
+        best = min(variants, key=lambda e: _variant_size(e, duration_ms))
+    return best
+
+
+class StdJson:
+    """默认的 JSON 后端 (标准库 json)，接口与插件的 fastjson 相同"""
+    JSONDecodeError = json.JSONDecodeError
+    loads = staticmethod(json.loads)
+
+    @staticmethod
+    def extract(data, picker):
+        return picker(json.loads(data))
+
+
+class NoMetrics:
+    """默认的指标钩子，不做任何统计，接口与插件的 metrics 相同"""
+
+    @staticmethod
+    def timer(stage: str, **attrs):
+        return nullcontext()
+
+    @staticmethod
+    def inc(name: str, value: float = 1, **labels):
+        pass
+
+
 class DouyinParser:
     """
     一个独立的抖音分享链接解析器。
+    json_backend / metrics / proxies 由宿主传入 (如插件的 fastjson、metrics、ProxyPool)，
+    不传时使用标准库 json、不做统计、直连，本包可单独导入使用。
     """
-    def __init__(self, cookie: str):
+    def __init__(self, cookie: str, max_video_bytes: int = 0, video_codec: str = "h264",
+                 json_backend=None, metrics=None, proxies=None):
         # 使用cookie_extractor格式化cookie
         self.cookie = extract_and_format_cookies(cookie) if cookie else ""
+        self.json = json_backend or StdJson
+        self.metrics = metrics or NoMetrics
+        self.proxies = proxies  # 需提供 pick(url) 与 report(proxy, url, ok, latency=None)
+        # 令牌刷新与短链解析是模块级的，一并经由宿主的代理池
+        if proxies is not None: TokenManager.pool = proxies
+        # 视频清晰度选择：字节预算 (0 为不限) 与首选编码
+        self.max_video_bytes = max_video_bytes
+        self.video_codec = video_codec if video_codec in VIDEO_CODECS else "h264"
         self.id_fetcher = AwemeIdFetcher()
         self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
         self.headers = {
@@ -23,9 +114,13 @@ class DouyinParser:
             "Cookie": self.cookie,
         }
 
-    async def fetch_video_data(self, aweme_id: str) -> dict:
+    async def fetch_video_data(self, aweme_id: str, extract=None) -> dict:
         """
         直接请求抖音API以获取视频数据。
+
+        Args:
+            extract: 可选，接收解码后的原始数据并返回所需字段的函数。
+                传入时只返回其结果，完整的响应树在提取后即可释放。
         """
         params = {
             "aweme_id": aweme_id,
@@ -54,26 +149,46 @@ class DouyinParser:
             "effective_type": "4g",
             "round_trip_time": "50",
             "webid": "7318500000000000000",
-            "msToken": "",
+            "msToken": TokenService.ms_token(),
         }
 
-        a_bogus = BogusManager.ab_model_2_endpoint(params, self.user_agent)
+        with self.metrics.timer("dy.sign"):
+            a_bogus = (await BogusManager.ab_models_2_endpoints([params], self.user_agent))[0]
         endpoint = f"{DouyinAPIEndpoints.POST_DETAIL}?{urlencode(params)}&a_bogus={a_bogus}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(endpoint, headers=self.headers)
+        headers = self.headers
+        ttwid = TokenService.ttwid()
+        if ttwid and "ttwid=" not in self.cookie:
+            headers = {**headers, "Cookie": f"{self.cookie}; ttwid={ttwid}" if self.cookie else f"ttwid={ttwid}"}
+
+        proxy = self.proxies.pick(endpoint) if self.proxies else None
+        mounts = {"all://": httpx.AsyncHTTPTransport(proxy=httpx.Proxy(proxy.url))} if proxy else None
+        start = time.monotonic()
+        async with httpx.AsyncClient(mounts=mounts) as client:
+            try:
+                with self.metrics.timer("dy.api", aweme_id=aweme_id, proxy=proxy.label if proxy else None):
+                    response = await client.get(endpoint, headers=headers)
+            except httpx.TransportError:
+                if self.proxies: self.proxies.report(proxy, endpoint, False)
+                raise
+            if self.proxies: self.proxies.report(proxy, endpoint, True, time.monotonic() - start)
             response.raise_for_status()
 
             # Check if response is empty
-            if not response.text:
-                raise ValueError(
+            if not response.content:
+                raise EmptyResponseError(
                     f"Empty response from Douyin API (aweme_id={aweme_id}). "
                     "This may indicate rate limiting, invalid cookie, or blocked request."
                 )
 
+            # 直接解码原始字节，避免先构造整段 str
+            self.metrics.inc("bytes", len(response.content), kind="api", site="douyin.com")
             try:
-                return response.json()
-            except json.JSONDecodeError as exc:
+                with self.metrics.timer("dy.decode"):
+                    if extract is not None:
+                        return self.json.extract(response.content, extract)
+                    return self.json.loads(response.content)
+            except self.json.JSONDecodeError as exc:
                 snippet = response.text[:200]
                 content_type = response.headers.get("Content-Type", "")
                 raise ValueError(
@@ -91,6 +206,20 @@ class DouyinParser:
 
         media_type = "unknown"
         media_urls = []
+        # 以下三项与 media_urls 一一对应：同一资源的全部 CDN 镜像地址 (首个即 media_urls 中的地址)、
+        # 资源类型 (video/image) 与字节数估计 (未知为 0)
+        media_mirrors = []
+        media_kinds = []
+        media_sizes = []
+
+        def add_video(video):
+            entry = select_video_entry(video, self.max_video_bytes, self.video_codec)
+            video_list = entry["play_addr"].get("url_list") or []
+            if video_list:
+                media_urls.append(video_list[0])
+                media_mirrors.append(list(video_list))
+                media_kinds.append("video")
+                media_sizes.append(_variant_size(entry, video.get("duration") or 0))
 
         # 最可靠的判断方式：检查是否存在 images 列表并且其不为空
         if aweme_detail.get("images") and len(aweme_detail["images"]) > 0:
@@ -102,20 +231,19 @@ class DouyinParser:
                 # 检查每个item是图片还是视频片段
                 if item.get("video"):
                     has_video_segment = True
-                    video_list = item.get("video", {}).get("play_addr", {}).get("url_list")
-                    if video_list:
-                        media_urls.append(video_list[0])
+                    add_video(item["video"])
                 elif item.get("url_list"):
                     # 提取最高清的图片链接
                     media_urls.append(item["url_list"][-1])
+                    media_mirrors.append(item["url_list"][::-1])
+                    media_kinds.append("image")
+                    media_sizes.append(0)
             if has_video_segment:
                 media_type = "multi_video"
         # 否则，当作普通单视频处理
         elif aweme_detail.get("video"):
             media_type = "video"
-            video_list = aweme_detail.get("video", {}).get("play_addr", {}).get("url_list")
-            if video_list:
-                media_urls.append(video_list[0])
+            add_video(aweme_detail["video"])
 
         # 提取基础信息
         processed_data = {
@@ -125,6 +253,9 @@ class DouyinParser:
             "create_time": aweme_detail.get("create_time"),
             "author_nickname": aweme_detail.get("author", {}).get("nickname"),
             "media_urls": media_urls,
+            "media_mirrors": media_mirrors,
+            "media_kinds": media_kinds,
+            "media_sizes": media_sizes,
         }
 
         return processed_data
@@ -139,37 +270,37 @@ class DouyinParser:
         Returns:
             包含核心视频信息的字典。
         """
-        print(f"正在解析链接: {share_url}")
+        logger.debug(f"正在解析链接: {share_url}")
 
         # 步骤 1: 从分享文案中提取有效的URL
         url_match = re.search(r"(https?://[^\s]+)", share_url)
         if not url_match:
-            print("未能在分享文案中找到有效的URL")
+            logger.debug("未能在分享文案中找到有效的URL")
             return {"error": "No valid URL found in the share text"}
 
         extracted_url = url_match.group(1)
-        print(f"成功提取URL: {extracted_url}")
+        logger.debug(f"成功提取URL: {extracted_url}")
 
         # 步骤 2: 从URL中提取 aweme_id
         try:
-            aweme_id = await self.id_fetcher.get_aweme_id(extracted_url)
+            with self.metrics.timer("dy.resolve", url=extracted_url):
+                aweme_id = await self.id_fetcher.get_aweme_id(extracted_url)
             if not aweme_id:
                 raise ValueError("未能从链接中提取到 aweme_id")
-            print(f"成功提取 aweme_id: {aweme_id}")
+            logger.debug(f"成功提取 aweme_id: {aweme_id}")
         except Exception as e:
-            print(f"提取 aweme_id 失败: {e}")
+            logger.debug(f"提取 aweme_id 失败: {e}")
             return {"error": "Failed to extract aweme_id", "details": str(e)}
 
         # 步骤 3: 使用 aweme_id 获取视频详情
         try:
-            raw_video_data = await self.fetch_video_data(aweme_id)
-            print("成功获取视频数据！")
-            # 步骤 4: 处理原始数据，提取核心信息
-            processed_data = self._process_data(raw_video_data)
+            # 步骤 4: 解码后立即提取核心信息，不保留完整的原始数据
+            processed_data = await self.fetch_video_data(aweme_id, extract=self._process_data)
+            logger.debug("成功获取视频数据！")
             return processed_data
         except Exception as e:
-            print(f"获取或处理视频数据失败: {e}")
-            return {"error": "Failed to fetch or process video data", "details": str(e)}
+            logger.debug(f"获取或处理视频数据失败: {e}")
+            return {"error": "Failed to fetch or process video data", "details": str(e), "throttled": is_throttled(e)}
 
 async def main():
     """
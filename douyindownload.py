@@ -1,19 +1,214 @@
 import os
+import time
+import uuid
+import asyncio
 import aiohttp
 import random
+from urllib.parse import urlparse
 from astrbot.api import logger
 
+from .deadline import budget, expired as deadline_expired
+from . import fastjson
+from .proxy_pool import ProxyPool, site_key
+from . import metrics, tracing
+
 class SmartDownloader:
-    @staticmethod
-    async def download(url: str, save_path: str, cookie: str = None, referer: str = None) -> bool:
-        if not url: return False
-        if os.path.exists(save_path) and os.path.getsize(save_path) > 0: return True
+    # 各 CDN 主机首字节延迟的指数移动平均 (秒)，用于给后续下载的镜像排序
+    host_latency = {}
+    EWMA_ALPHA = 0.3
+    FAIL_PENALTY = 10.0  # 失败的主机按该延迟计入，逐渐排到后面
+    RACE_WIDTH = 3       # 同时竞速的镜像数
+    CHUNK_SIZE = 256 * 1024
+
+    # 请求头策略记分板：{域名: {策略名: [成功次数, 失败次数]}}，持久化到缓存目录
+    SCOREBOARD_FILE = "download_scoreboard.json"
+    SCORE_WINDOW = 50    # 单项计数超过该值时减半，让记分板跟上站点策略的变化
+    SAVE_INTERVAL = 30
+    scoreboard = {}
+    scoreboard_path = None
+    hedge_delay = 0.0    # >0 时，首选策略在该秒数内未完成就并发启动次选策略
+    _dirty = False
+    _saved_at = 0.0
+
+    @classmethod
+    def configure(cls, cache_dir: str, hedge_delay: float = 0):
+        """设置记分板位置与对冲延迟，并载入已保存的记分板"""
+        cls.scoreboard_path = os.path.join(cache_dir, cls.SCOREBOARD_FILE)
+        cls.hedge_delay = max(0.0, float(hedge_delay or 0))
+        try:
+            with open(cls.scoreboard_path, "rb") as f: cls.scoreboard = fastjson.loads(f.read())
+        except (OSError, ValueError):
+            cls.scoreboard = {}
+
+    @classmethod
+    def save_scoreboard(cls, force: bool = False):
+        if not cls.scoreboard_path or not cls._dirty: return
+        if not force and time.monotonic() - cls._saved_at < cls.SAVE_INTERVAL: return
+        tmp_path = cls.scoreboard_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f: f.write(fastjson.dumps(cls.scoreboard))
+            os.replace(tmp_path, cls.scoreboard_path)
+            cls._dirty = False
+            cls._saved_at = time.monotonic()
+        except OSError as e:
+            logger.warning(f"保存下载记分板失败: {e}")
+
+    @classmethod
+    def record_result(cls, key: str, strategy: str, ok: bool):
+        counts = cls.scoreboard.setdefault(key, {}).setdefault(strategy, [0, 0])
+        counts[0 if ok else 1] += 1
+        if counts[0] + counts[1] > cls.SCORE_WINDOW:
+            counts[0], counts[1] = counts[0] // 2, counts[1] // 2
+        cls._dirty = True
+
+    @classmethod
+    def order_strategies(cls, key: str, strategies: list) -> list:
+        """按成功率 (拉普拉斯平滑) 从高到低排序，没有记录的为 0.5，同分保持默认顺序"""
+        board = cls.scoreboard.get(key, {})
+
+        def score(strategy):
+            ok, fail = board.get(strategy["name"], (0, 0))
+            return (ok + 1) / (ok + fail + 2)
+        return sorted(strategies, key=score, reverse=True)
+
+    @classmethod
+    def record_latency(cls, url: str, seconds: float):
+        host = urlparse(url).hostname or ""
+        old = cls.host_latency.get(host)
+        cls.host_latency[host] = seconds if old is None else old + cls.EWMA_ALPHA * (seconds - old)
+
+    @classmethod
+    def order_mirrors(cls, urls: list) -> list:
+        """去重并按主机延迟排序；没有记录的主机排在最前以便探测，同分时保持原顺序"""
+        unique = list(dict.fromkeys(u for u in urls if u))
+        return sorted(unique, key=lambda u: cls.host_latency.get(urlparse(u).hostname or "", 0.0))
 
-        if not referer:
-            if "douyin" in url: referer = "https://www.douyin.com/"
-            elif "bili" in url: referer = "https://www.bilibili.com/"
-            elif "xiaohongshu" in url: referer = "https://www.xiaohongshu.com/"
-            else: referer = ""
+    @classmethod
+    async def _open(cls, session, url: str, headers: dict, timeout):
+        """请求一个镜像并读到首个数据块，返回 (resp, 首块)；代理按首字节延迟记分"""
+        start = time.monotonic()
+        with tracing.span("download.open", host=urlparse(url).hostname):
+            async with ProxyPool.use(url) as proxy:
+                resp = await session.get(url, headers=headers, timeout=timeout, proxy=proxy)
+                try:
+                    if resp.status != 200: raise aiohttp.ClientResponseError(resp.request_info, (), status=resp.status)
+                    first = await resp.content.readany()
+                except BaseException:
+                    resp.release()
+                    raise
+        cls.record_latency(url, time.monotonic() - start)
+        metrics.observe("download.ttfb", time.monotonic() - start)
+        return resp, first
+
+    @classmethod
+    async def _race(cls, session, urls: list, headers: dict, timeout):
+        """多个镜像同时请求，保留最先返回首字节的一个，其余取消；全部失败返回 None"""
+        tasks = {asyncio.ensure_future(cls._open(session, u, headers, timeout)): u for u in urls}
+        winner = None
+        start = time.monotonic()
+        try:
+            while tasks and winner is None:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url = tasks.pop(task)
+                    if task.exception() is not None:
+                        # 任务预算耗尽导致的失败与镜像本身无关，不计入延迟
+                        if not deadline_expired(): cls.record_latency(url, cls.FAIL_PENALTY)
+                    elif winner is None:
+                        winner = (url, *task.result())
+                    else:
+                        task.result()[0].release()
+        finally:
+            # 被淘汰的镜像至少比胜者慢，按已等待的时长记一次，避免无记录的慢主机一直排在前面
+            if winner:
+                for url in tasks.values(): cls.record_latency(url, time.monotonic() - start)
+            for task in tasks: task.cancel()
+            for result in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(result, tuple): result[0].release()
+        return winner
+
+    @classmethod
+    async def _attempt(cls, strategy: dict, candidates: list, part_path: str, cookie: str, timeout: float):
+        """用一种请求头策略下载到 part_path，成功返回 part_path，失败返回 None"""
+        headers = strategy["headers"].copy()
+        if cookie and strategy["use_cookie"]: headers["Cookie"] = cookie
+        if "Referer" in headers and not headers["Referer"]: del headers["Referer"]
+
+        winner = None
+        ok = False
+        try:
+            async with aiohttp.ClientSession() as session:
+                client_timeout = aiohttp.ClientTimeout(total=budget(timeout), connect=budget(15))
+                for start in range(0, len(candidates), cls.RACE_WIDTH):
+                    winner = await cls._race(session, candidates[start:start + cls.RACE_WIDTH], headers, client_timeout)
+                    if winner: break
+                if not winner: return None
+
+                _, resp, chunk = winner
+                size = 0
+                try:
+                    with open(part_path, 'wb') as f:
+                        while chunk:
+                            f.write(chunk)
+                            size += len(chunk)
+                            chunk = await resp.content.read(cls.CHUNK_SIZE)
+                finally:
+                    resp.release()
+                ok = size > 1000
+                metrics.inc("bytes", size, kind="download", site=site_key(winner[0]))
+                return part_path if ok else None
+        except Exception:
+            if winner and not deadline_expired(): cls.record_latency(winner[0], cls.FAIL_PENALTY)
+            return None
+        finally:
+            if not ok and os.path.exists(part_path): os.remove(part_path)
+
+    @classmethod
+    async def _scored(cls, key: str, strategy: dict, *args):
+        """执行一次策略尝试并记入记分板；被对冲取消或因任务预算耗尽而失败的尝试不计分"""
+        with tracing.span("download.attempt", strategy=strategy["name"]) as span:
+            part_path = await cls._attempt(strategy, *args)
+            if span: span.set(ok=part_path is not None)
+        if part_path is not None or not deadline_expired():
+            cls.record_result(key, strategy["name"], part_path is not None)
+        return part_path
+
+    @classmethod
+    async def _hedge(cls, first, second):
+        """先执行 first；hedge_delay 秒内未完成则并发执行 second，取先成功者并取消另一个"""
+        tasks = [asyncio.ensure_future(first)]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=cls.hedge_delay)
+            if done:
+                if tasks[0].result(): return tasks[0].result()
+                return await second
+            tasks.append(asyncio.ensure_future(second))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result(): return task.result()
+            return None
+        finally:
+            if len(tasks) == 1: second.close()
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    async def download(cls, url: str, save_path: str, cookie: str = None, referer: str = None,
+                       mirrors: list = None, timeout: float = 60) -> bool:
+        """
+        下载文件。mirrors 为同一资源的其他 CDN 地址，会与 url 一起按历史延迟排序，
+        每次取前 RACE_WIDTH 个竞速首字节，保留最快的继续下载；
+        请求头策略按记分板中该域名的历史成功率排序，开启对冲时前两种策略可并发。
+        referer/cookie 由调用方按平台决定，为空时不发送
+        """
+        if not url: return False
+        if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
+            metrics.inc("cache", cache="download", result="hit")
+            return True
+        metrics.inc("cache", cache="download", result="miss")
+        candidates = cls.order_mirrors([url, *(mirrors or [])])
 
         strategies = [
             {
@@ -49,23 +244,30 @@ class SmartDownloader:
             }
         ]
 
-        for i, strategy in enumerate(strategies):
-            name = strategy["name"]
-            headers = strategy["headers"].copy()
-            if cookie and strategy["use_cookie"]: headers["Cookie"] = cookie
-            if "Referer" in headers and not headers["Referer"]: del headers["Referer"]
-
+        key = site_key(url)
+        ordered = cls.order_strategies(key, strategies)
+        # 临时文件名带上随机标记，同一文件被多个任务同时下载时互不覆盖
+        tag = uuid.uuid4().hex[:8]
+        attempts = [cls._scored(key, strategy, candidates, f"{save_path}.{tag}.{i}.part", cookie, timeout)
+                    for i, strategy in enumerate(ordered)]
+        with metrics.timer("download", host=urlparse(url).hostname, mirrors=len(candidates)):
             try:
-                async with aiohttp.ClientSession() as session:
-                    timeout = aiohttp.ClientTimeout(total=60, connect=15)
-                    async with session.get(url, headers=headers, timeout=timeout) as resp:
-                        if resp.status == 200:
-                            content = await resp.read()
-                            if len(content) > 1000: 
-                                with open(save_path, 'wb') as f: f.write(content)
-                                return True
-                        elif resp.status == 403: continue
-            except Exception: pass
+                if cls.hedge_delay > 0 and len(attempts) > 1:
+                    part_path = await cls._hedge(attempts[0], attempts[1])
+                    attempts = attempts[2:]
+                else:
+                    part_path = None
+                # 任务预算耗尽后其余策略只会立即超时，不再尝试
+                while not part_path and attempts and not deadline_expired():
+                    part_path = await attempts.pop(0)
+            finally:
+                for attempt in attempts: attempt.close()
+                cls.save_scoreboard()
+
+        if part_path:
+            os.replace(part_path, save_path)
+            return True
 
+        metrics.error("download", "all_strategies_failed")
         logger.error(f"❌ 下载失败: {url}")
         return False
\ No newline at end of file
@@ -0,0 +1,40 @@
+import json
+
+# 安装了 orjson 时用它解码/编码，否则回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，两种后端都能用它捕获
+JSONDecodeError = json.JSONDecodeError
+
+
+def backend_name() -> str:
+    return "orjson" if orjson is not None else "json"
+
+
+def loads(data):
+    """解码 bytes/str，bytes 直接交给解码器，省去先转成 str 的一次拷贝"""
+    if orjson is not None: return orjson.loads(data)
+    if isinstance(data, memoryview): data = bytes(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+def extract(data, picker):
+    """
+    解码后立即用 picker 取出所需字段，只返回 picker 的结果；
+    完整的解析树不会被返回或缓存，函数结束即可被回收
+    """
+    return picker(loads(data))
+
+
+async def read_json(resp):
+    """读取 aiohttp 响应体并解码，不检查 Content-Type"""
+    return loads(await resp.read())
@@ -0,0 +1,146 @@
+import os
+import time
+import shutil
+import asyncio
+import uuid
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from astrbot.api import logger
+
+from . import metrics, tracing
+
+# Pillow 为可选依赖，未安装时只按文件头修正扩展名，不做转码
+try:
+    from PIL import Image as PILImage, ImageOps
+except ImportError:
+    PILImage = None
+
+# 聊天客户端普遍能直接显示的格式；其余 (HEIC/AVIF/BMP) 一律转为 JPEG
+DISPLAYABLE = (".jpg", ".png", ".gif", ".webp")
+EXTENSIONS = DISPLAYABLE + (".heic", ".avif", ".bmp")
+
+
+def sniff(path: str) -> str:
+    """按文件头判断真实格式，返回扩展名；无法识别时返回空字符串"""
+    try:
+        with open(path, "rb") as f: head = f.read(32)
+    except OSError:
+        return ""
+    if head.startswith(b"\xff\xd8\xff"): return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"): return ".png"
+    if head[:6] in (b"GIF87a", b"GIF89a"): return ".gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP": return ".webp"
+    if head[:2] == b"BM": return ".bmp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"avif", b"avis"): return ".avif"
+        if brand in (b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1"): return ".heic"
+        return ".mp4"
+    return ""
+
+
+def _recompress(src: str, dst: str, max_side: int, max_bytes: int, quality: int) -> bool:
+    """
+    在子进程中执行：超出边长/体积预算或不是常见格式时缩放并另存为 JPEG (有透明通道时为 PNG)，
+    写入 dst 返回 True；无需处理或无法解码时返回 False
+    """
+    try:
+        import pillow_heif
+        pillow_heif.register_heif_opener()
+    except ImportError:
+        pass
+
+    with PILImage.open(src) as im:
+        ext = "." + (im.format or "").lower().replace("jpeg", "jpg")
+        too_large = bool(max_side) and max(im.size) > max_side
+        too_heavy = bool(max_bytes) and os.path.getsize(src) > max_bytes
+        # 动图转码会丢帧，保持原样
+        if getattr(im, "is_animated", False): return False
+        if not (too_large or too_heavy or ext not in DISPLAYABLE): return False
+
+        im = ImageOps.exif_transpose(im)
+        if too_large: im.thumbnail((max_side, max_side), PILImage.LANCZOS)
+        if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+            im.save(dst, "PNG", optimize=True)
+        else:
+            im.convert("RGB").save(dst, "JPEG", quality=quality, optimize=True, progressive=True)
+    return True
+
+
+class ImageProcessor:
+    """
+    图片后处理：按文件头修正扩展名，开启压缩时把超出预算的图片交给进程池缩放/转码。
+    结果以内容 ID (与 CDN 地址无关) 为键缓存在缓存目录，同一作品再次解析时无需下载和处理
+    """
+    QUALITY = 85
+
+    def __init__(self, cache_dir: str, enabled: bool = False, max_mb: float = 2, max_side: int = 2560,
+                 workers: int = 0, tag: str = ""):
+        self.cache_dir = cache_dir
+        self.tag = tag   # 影响下载内容的其他配置 (如 CDN 缩放变体)，附加到缓存键
+        self.enabled = enabled and PILImage is not None
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb > 0 else 0
+        self.max_side = max(0, max_side)
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor = None
+        if enabled and PILImage is None: logger.warning("[ImageProcessor] 未安装 Pillow，图片压缩已关闭")
+
+    def _key(self, item) -> str:
+        # 预算参与缓存键，修改配置后不会取到旧结果
+        budget = f"{self.max_side}:{self.max_bytes}" if self.enabled else "raw"
+        return hashlib.md5(f"{item.content_id}|{budget}|{self.tag}".encode("utf-8")).hexdigest()
+
+    def cached(self, item) -> str:
+        """按内容 ID 查找已处理的文件，没有时返回 None"""
+        if not item.content_id: return None
+        base = os.path.join(self.cache_dir, f"img_{self._key(item)}")
+        for ext in EXTENSIONS:
+            if os.path.exists(base + ext):
+                metrics.inc("cache", cache="image", result="hit")
+                return base + ext
+        return None
+
+    async def process(self, item, path: str) -> str:
+        """处理下载好的图片，返回可发送的文件路径；出错时返回原文件"""
+        ext = sniff(path) or os.path.splitext(path)[1]
+        if not item.content_id and ext == os.path.splitext(path)[1] and not self.enabled: return path
+        metrics.inc("cache", cache="image", result="miss")
+        base = os.path.join(self.cache_dir, f"img_{self._key(item)}" if item.content_id else
+                            f"img_{os.path.splitext(os.path.basename(path))[0]}")
+
+        if self.enabled:
+            out = f"{base}.{uuid.uuid4().hex[:8]}.proc"
+            start = time.monotonic()
+            try:
+                with tracing.span("image.recompress", ext=ext, size=os.path.getsize(path)):
+                    done = await asyncio.get_running_loop().run_in_executor(
+                        self._get_executor(), _recompress, path, out, self.max_side, self.max_bytes, self.QUALITY)
+                metrics.observe("image.recompress", time.monotonic() - start)
+                if done:
+                    metrics.inc("bytes", max(0, os.path.getsize(path) - os.path.getsize(out)), kind="image_saved")
+                    final = base + sniff(out)
+                    os.replace(out, final)
+                    return final
+            except Exception as e:
+                logger.warning(f"[ImageProcessor] 处理 {os.path.basename(path)} 失败: {e}")
+            if os.path.exists(out): os.remove(out)
+
+        # 不需要转码：以正确的扩展名链接原文件，同样按内容 ID 缓存
+        final = base + ext
+        if final == path or os.path.exists(final): return final
+        try:
+            os.link(path, final)
+        except OSError:
+            try: shutil.copyfile(path, final)
+            except OSError: return path
+        return final
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
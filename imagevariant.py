@@ -0,0 +1,42 @@
+import re
+from urllib.parse import urlsplit, urlunsplit
+
+# 各平台图片 CDN 的服务端缩放/转码参数。每个函数接收一个图片地址，返回限制最大边长 max_side、
+# 格式为 fmt (jpg/webp) 的变体地址；地址不是该 CDN 可识别的形式时返回 None，由调用方使用原图
+QUALITY = 85
+FORMATS = ("jpg", "webp")
+
+_TPLV = re.compile(r"~tplv-[^/]+$")
+
+
+def bili(url: str, max_side: int, fmt: str):
+    """hdslb: /bfs/... 后追加 @<宽>w_<质量>q.<格式>，只限制宽度 (长图保持可读)"""
+    parts = urlsplit(url)
+    if not parts.path.startswith("/bfs/"): return None
+    path = parts.path.split("@", 1)[0]
+    return urlunsplit((parts.scheme, parts.netloc, f"{path}@{max_side}w_{QUALITY}q.{fmt}", "", ""))
+
+
+def xhs(url: str, max_side: int, fmt: str):
+    """xhscdn / ci.xiaohongshu.com: 使用 imageView2 模式 2 (宽高均不超过 max_side，等比缩放)"""
+    parts = urlsplit(url)
+    # 带 !样式 后缀的是签名地址，改动会失效；已有其他查询参数的也不动
+    if "!" in parts.path or len(parts.path) <= 1: return None
+    if parts.query and not parts.query.startswith("imageView2"): return None
+    query = f"imageView2/2/w/{max_side}/h/{max_side}/format/{fmt}/q/{QUALITY}"
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+def douyin(url: str, max_side: int, fmt: str):
+    """
+    douyinpic: 替换 ~tplv 模板为按短边缩放的模板。签名地址 (x-signature) 的模板在签名范围内，
+    不能改写，只挑选镜像中已是目标格式的地址
+    """
+    parts = urlsplit(url)
+    match = _TPLV.search(parts.path)
+    if not match: return None
+    ext = "jpeg" if fmt == "jpg" else fmt
+    if "x-signature" in parts.query:
+        return url if match.group().endswith((f".{ext}", f".{fmt}")) else None
+    path = parts.path[:match.start()] + f"~tplv-dy-resize-origshort-autoq-75:{max_side}.{ext}"
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, ""))
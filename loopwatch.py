@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter
+from astrbot.api import logger
+
+from . import metrics
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopWatchdog:
+    """
+    事件循环延迟监控：循环内的心跳协程每 INTERVAL 秒醒来一次，实际醒来时间与预期之差即调度延迟，
+    记入 metrics 的 loop.lag 阶段；另一个守护线程检查心跳，超过 threshold 没有更新时抓取
+    事件循环线程的调用栈，归因到最内层的插件代码 (文件:函数)，每次卡顿只抓取一次。
+    守护线程只负责抓栈，统计与日志在心跳恢复时由事件循环线程完成，卡顿时长即恢复时测得的延迟
+    """
+    INTERVAL = 0.1
+    KEEP_STACKS = 20
+
+    def __init__(self, threshold: float = 0.1):
+        self.threshold = threshold
+        self.offenders = Counter()   # {插件函数: 卡顿次数}
+        self.stacks = {}             # {插件函数: 最近一次的调用栈}
+        self.worst = {}              # {插件函数: 抓取时已卡住的最长秒数}
+        self.heartbeat = time.monotonic()
+        self.loop_thread = None
+        self.task = None
+        self.thread = None
+        self._stop = threading.Event()
+        self._captured = False
+        self._pending = None         # 守护线程抓到、等待心跳恢复后记录的 (调用栈, 抓取时已卡住的秒数)
+
+    def start(self):
+        """在事件循环内调用"""
+        if self.task is not None or self.threshold <= 0: return
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stop.clear()
+        self.task = asyncio.create_task(self._beat())
+        self.thread = threading.Thread(target=self._watch, name="parse_hub_loopwatch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.task: self.task.cancel()
+        self.task = None
+        self.thread = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.INTERVAL
+            await asyncio.sleep(self.INTERVAL)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            metrics.observe("loop.lag", lag)
+            self.heartbeat = now
+            pending, self._pending = self._pending, None
+            if pending is not None: self._record(pending[0], max(lag, pending[1]))
+
+    def _watch(self):
+        while not self._stop.wait(min(self.threshold / 2, self.INTERVAL)):
+            stalled = time.monotonic() - self.heartbeat - self.INTERVAL
+            if stalled < self.threshold:
+                self._captured = False
+                continue
+            if self._captured: continue
+            self._captured = True
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is not None: self._pending = (traceback.extract_stack(frame), stalled)
+
+    @staticmethod
+    def attribute(stack) -> str:
+        """取最内层位于插件目录内的栈帧作为归因位置；整条栈都不在插件内时取最内层帧"""
+        for entry in reversed(stack):
+            if entry.filename.startswith(PLUGIN_DIR) and entry.filename != __file__:
+                return f"{os.path.relpath(entry.filename, PLUGIN_DIR)}:{entry.name}"
+        if not stack: return "unknown"
+        return f"(外部) {os.path.basename(stack[-1].filename)}:{stack[-1].name}"
+
+    def _record(self, stack, stalled: float):
+        """在事件循环线程中调用，stalled 为本次卡顿的实际时长"""
+        where = self.attribute(stack)
+        self.offenders[where] += 1
+        self.worst[where] = max(self.worst.get(where, 0.0), stalled)
+        self.stacks[where] = "".join(traceback.format_list(stack[-12:]))
+        if len(self.stacks) > self.KEEP_STACKS:
+            self.stacks.pop(next(iter(self.stacks)))
+        metrics.inc("loop_blocked", where=where)
+        logger.warning(f"事件循环已阻塞 {stalled * 1000:.0f} ms，位置: {where}\n{self.stacks[where]}")
+
+    def snapshot(self, top: int = 5) -> list:
+        """阻塞次数最多的插件函数"""
+        return [{"where": where, "count": n, "worst_ms": round(self.worst[where] * 1000)}
+                for where, n in self.offenders.most_common(top)]
@@ -13,6 +13,14 @@ from .xhs import XhsHandler
 from .douyin import DouyinHandler
 from .bili import BiliHandler
 from .douyindownload import SmartDownloader
+from .deadline import Deadline, DeadlineExceeded, StageTimeout
+from .throttle import Throttle, CircuitOpen
+from .proxy_pool import ProxyPool
+from .models import MediaItem
+from .registry import Platform, PlatformRegistry
+from .imageproc import ImageProcessor
+from . import metrics, tracing, profiling, imagevariant
+from .loopwatch import LoopWatchdog
 
 @register("parse_hub", "Neilyo", "全能聚合解析插件", "1.0.0")
 class ParseHub(Star):
@@ -35,40 +43,117 @@ class ParseHub(Star):
         if not os.path.exists(self.cache_dir): os.makedirs(self.cache_dir)
 
         self.cleanup_interval = config.get("cache_cleanup_interval", 3600)
+        SmartDownloader.configure(self.cache_dir, config.get("download_hedge_delay", 0))
+        ProxyPool.configure(
+            config.get("proxy_list", []),
+            probe_interval=config.get("proxy_probe_interval", 60),
+            eject_time=config.get("proxy_eject_time", 60)
+        )
+        self.job_timeout = config.get("job_timeout", 180)
+        # 各平台接口限速与熔断
+        self.throttle = Throttle(
+            rate_per_minute=config.get("api_rate_limit", 30),
+            cooldown=config.get("circuit_cooldown", 60)
+        )
 
         # 初始化各平台处理器
-        self.xhs_handler = XhsHandler(config.get("api_url", "http://127.0.0.1:5556/xhs/"))
-        self.douyin_handler = DouyinHandler(cookie=config.get("douyin_cookie", ""))
+        self.xhs_handler = XhsHandler(
+            config.get("api_url", "http://127.0.0.1:5556/xhs/"),
+            api_urls=config.get("xhs_api_urls", []),
+            health_interval=config.get("xhs_health_interval", 30)
+        )
+        self.douyin_handler = DouyinHandler(
+            cookie=config.get("douyin_cookie", ""),
+            cookies=config.get("douyin_cookies", []),
+            cookie_cooldown=config.get("douyin_cookie_cooldown", 300),
+            max_video_mb=config.get("douyin_max_video_mb", 0),
+            video_codec=config.get("douyin_video_codec", "h264")
+        )
         
         bili_use_login = config.get("bili_use_login", False)
         self.bili_download = config.get("bili_download_video", False)
         self.bili_handler = BiliHandler(self.cache_dir, bili_use_login)
         
         self.cleanup_task = None
-
-        # 链接识别正则
-        self.regex_bili = [
-            r'(b23\.tv|bili2233\.cn)/[a-zA-Z0-9]+',
-            r'bilibili\.com/video/(av\d+|BV\w+)',
-            r'bilibili\.com/opus/\d+',
-            r't\.bilibili\.com/\d+'
-        ]
-        self.regex_douyin = [
-            r'v\.douyin\.com/[a-zA-Z0-9/]+',
-            r'douyin\.com/(video|note)/\d+'
-        ]
-        self.regex_xhs = [
-            r'xhslink\.com/[a-zA-Z0-9/]+',
-            r'xiaohongshu\.com/(explore|discovery/item)/[a-zA-Z0-9]+'
-        ]
+        # 后台发送通知等一次性任务；事件循环只持有任务的弱引用，需在此保留到任务结束
+        self.background_tasks = set()
+        # 定期把运行指标写成 Prometheus 文本文件，0 表示关闭
+        self.metrics_interval = config.get("metrics_file_interval", 0)
+        self.metrics_path = os.path.join(self.cache_dir, "metrics.prom")
+        self.metrics_task = None
+        # 任务 ID 写入本插件的日志；开启追踪时各阶段 span 写入缓存目录的 traces.jsonl
+        self.trace_path = os.path.join(self.cache_dir, "traces.jsonl")
+        tracing.configure(self.trace_path if config.get("trace_enabled", False) else None)
+        self.log_filter = tracing.JobLogFilter()
+        logger.addFilter(self.log_filter)
+        # 事件循环阻塞超过该毫秒数时抓取调用栈，0 表示关闭
+        self.watchdog = LoopWatchdog(config.get("loop_lag_threshold_ms", 200) / 1000)
+
+        # 图片最大边长 (0 为下载原图) 与格式，由各平台 CDN 在服务端缩放转码
+        self.image_max_side = config.get("image_max_side", 0)
+        self.image_format = config.get("image_format", "jpg")
+        if self.image_format not in imagevariant.FORMATS: self.image_format = "jpg"
+        # 下载后的图片按文件头修正扩展名，开启压缩时超出预算的交给进程池缩放/转码
+        self.images = ImageProcessor(
+            self.cache_dir,
+            enabled=config.get("image_recompress", False),
+            max_mb=config.get("image_recompress_mb", 2),
+            max_side=config.get("image_recompress_side", 2560),
+            workers=config.get("image_recompress_workers", 0),
+            tag=f"{self.image_max_side}:{self.image_format}"
+        )
+
+        # 平台注册表：按域名后缀识别链接并挑选下载请求头，新增平台只需注册一个 Platform
+        self.platforms = PlatformRegistry()
+        self.platforms.register(Platform(
+            "xhs", "小红书",
+            hosts=("xhslink.com", "xiaohongshu.com"),
+            patterns=(r'xhslink\.com/[a-zA-Z0-9/]+', r'xiaohongshu\.com/(explore|discovery/item)/[a-zA-Z0-9]+'),
+            media_hosts=("xhscdn.com",),
+            referer="https://www.xiaohongshu.com/", handler=self.xhs_handler, image_variant=imagevariant.xhs
+        ))
+        self.platforms.register(Platform(
+            "dy", "抖音",
+            hosts=("douyin.com", "iesdouyin.com"),
+            patterns=(r'v\.douyin\.com/[a-zA-Z0-9/]+', r'douyin\.com/(video|note)/\d+'),
+            media_hosts=("douyinvod.com", "douyinpic.com", "douyincdn.com", "douyinstatic.com"),
+            referer="https://www.douyin.com/", cookie=lambda: self.douyin_handler.cookie,
+            handler=self.douyin_handler, image_variant=imagevariant.douyin
+        ))
+        self.platforms.register(Platform(
+            "bili", "B站",
+            hosts=("bilibili.com", "b23.tv", "bili2233.cn"),
+            patterns=(r'(b23\.tv|bili2233\.cn)/[a-zA-Z0-9]+', r'bilibili\.com/video/(av\d+|BV\w+)',
+                      r'bilibili\.com/opus/\d+', r't\.bilibili\.com/\d+'),
+            media_hosts=("hdslb.com", "bilivideo.com", "bilivideo.cn"),
+            referer="https://www.bilibili.com/", handler=self.bili_handler, deliver=self._deliver_bili,
+            image_variant=imagevariant.bili
+        ))
 
     async def initialize(self):
         logger.info(f"========== 聚合解析插件启动 (v1.0.0) ==========")
+        self.douyin_handler.start()
+        self.xhs_handler.start()
+        self.watchdog.start()
+        ProxyPool.start()
         if self.enable_cache and self.cleanup_interval > 0:
             self.cleanup_task = asyncio.create_task(self._auto_cleanup_loop())
+        if self.metrics_interval > 0:
+            self.metrics_task = asyncio.create_task(self._metrics_loop())
 
     async def terminate(self):
         if self.cleanup_task: self.cleanup_task.cancel()
+        if self.metrics_task: self.metrics_task.cancel()
+        for task in self.background_tasks: task.cancel()
+        self.douyin_handler.close()
+        self.images.close()
+        await self.xhs_handler.close()
+        ProxyPool.stop()
+        profiling.stop()
+        self.watchdog.stop()
+        logger.removeFilter(self.log_filter)
+        tracing.exporter.close()
+        SmartDownloader.save_scoreboard(force=True)
 
     async def _auto_cleanup_loop(self):
         """定期清理过期缓存文件"""
@@ -79,12 +164,112 @@ class ParseHub(Star):
                     now = time.time()
                     for filename in os.listdir(self.cache_dir):
                         if "cookie" in filename or "session" in filename: continue
+                        if filename in (SmartDownloader.SCOREBOARD_FILE, os.path.basename(self.metrics_path)): continue
+                        if filename.startswith(os.path.basename(self.trace_path)): continue
+                        if filename.startswith("profile-"): continue
                         path = os.path.join(self.cache_dir, filename)
                         if os.path.isfile(path) and now - os.path.getmtime(path) > self.cleanup_interval:
                             try: os.remove(path)
                             except: pass
             except: break
 
+    async def _metrics_loop(self):
+        """定期写出 Prometheus 文本文件"""
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            try: metrics.write_prometheus(self.metrics_path, self._gauges())
+            except Exception as e: logger.warning(f"写入指标文件失败: {e}")
+
+    def _gauges(self) -> list:
+        """熔断器、Cookie 池、代理池与小红书后端的瞬时状态，导出为 Prometheus gauge"""
+        gauges = []
+        states = {"closed": 0, "half_open": 1, "open": 2}
+        for platform, s in self.throttle.snapshot().items():
+            if not isinstance(s, dict): continue
+            gauges.append(("circuit_state", {"platform": platform}, states.get(s["state"], 0)))
+            gauges.append(("limiter_tokens", {"platform": platform}, s["tokens"]))
+        for c in self.douyin_handler.cookie_pool.snapshot():
+            gauges.append(("cookie_success_rate", {"cookie": c["cookie"]}, c["success_rate"]))
+            gauges.append(("cookie_latency_ms", {"cookie": c["cookie"]}, c["latency_ms"]))
+            gauges.append(("cookie_cooldown_seconds", {"cookie": c["cookie"]}, c["cooldown_seconds"]))
+        for p in ProxyPool.snapshot():
+            gauges.append(("proxy_success_rate", {"proxy": p["proxy"]}, p["success_rate"]))
+            gauges.append(("proxy_ejected_seconds", {"proxy": p["proxy"]}, p["ejected_seconds"]))
+            for site, ms in p["latency_ms"].items():
+                gauges.append(("proxy_latency_ms", {"proxy": p["proxy"], "site": site}, ms))
+        for b in self.xhs_handler.snapshot():
+            gauges.append(("xhs_backend_healthy", {"backend": b["backend"]}, int(b["healthy"])))
+            gauges.append(("xhs_backend_outstanding", {"backend": b["backend"]}, b["outstanding"]))
+            gauges.append(("xhs_backend_latency_ms", {"backend": b["backend"]}, b["latency_ms"]))
+        gauges.append(("crawler_log_dropped", {}, self.douyin_handler.log_dropped))
+        return gauges
+
+    def format_stats(self) -> str:
+        """/jx stats 的文本输出"""
+        data = metrics.summary()
+        lines = [f"📊 运行统计 (已运行 {data['uptime_seconds']} 秒)", "", "【阶段耗时】次数 | 平均 | p50 | p95 | p99 (ms)"]
+        for stage, s in data["stages"].items():
+            lines.append(f"{stage}: {s['count']} | {s['avg_ms']} | {s['p50_ms']} | {s['p95_ms']} | {s['p99_ms']}")
+        if data["counters"]:
+            lines += ["", "【计数】"]
+            lines += [f"{name}: {value:g}" for name, value in data["counters"].items()]
+
+        dropped = self.douyin_handler.log_dropped
+        if dropped: lines += ["", f"【日志】抖音抓取库日志队列已满，丢弃 {dropped} 条"]
+
+        blocked = self.watchdog.snapshot()
+        if blocked:
+            lines += ["", "【事件循环阻塞】位置: 次数 (最长 ms)"]
+            lines += [f"{b['where']}: {b['count']} ({b['worst_ms']})" for b in blocked]
+
+        throttle = self.throttle.snapshot()
+        lines += ["", f"【限流/熔断】缓存 {throttle.pop('cache_entries')} 条"]
+        for platform, s in throttle.items():
+            lines.append(f"{platform}: {s['state']} 请求 {s['requests']} 限流 {s['throttled']} 拒绝 {s['rejected']} 缓存命中 {s['cache_hits']}")
+        pools = [("抖音 Cookie", self.douyin_handler.cookie_pool.snapshot()),
+                 ("代理", ProxyPool.snapshot()), ("小红书后端", self.xhs_handler.snapshot())]
+        for title, rows in pools:
+            if not rows: continue
+            lines += ["", f"【{title}】"]
+            for row in rows:
+                name, *rest = row.values()
+                lines.append(f"{name}: " + " ".join(f"{k}={v}" for k, v in zip(list(row)[1:], rest)))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _record_upload(path: str, start: float):
+        """生成器在消息发出后才恢复执行，yield 前后的间隔即上传耗时"""
+        metrics.observe("upload", time.monotonic() - start)
+        try: metrics.inc("bytes", os.path.getsize(path), kind="upload")
+        except OSError: pass
+
+    def profile_cmd(self, event: AstrMessageEvent, args: list) -> str:
+        """/jx profile [N | Ts | stop]：分析接下来 N 个任务 (默认 1) 或 T 秒，报告写入缓存目录"""
+        arg = args[0] if args else "1"
+        if arg == "stop":
+            path = profiling.stop()
+            return f"📈 性能分析已结束，报告: {path}" if path else "⚠️ 当前没有进行中的性能分析。"
+        try:
+            if arg.endswith("s"): jobs, seconds = 0, min(float(arg[:-1]), 600)
+            else: jobs, seconds = min(int(arg), 50), 0
+        except ValueError:
+            return "用法: /jx profile [任务数 | 秒数s | stop]，如 /jx profile 3 或 /jx profile 30s"
+        if jobs <= 0 and seconds <= 0: return "⚠️ 任务数或秒数需大于 0。"
+
+        session = profiling.start(self.cache_dir, jobs=jobs, seconds=seconds)
+        if session is None: return "⚠️ 已有进行中的性能分析，可发送 /jx profile stop 结束。"
+
+        async def notify():
+            path = await session.done
+            if path:
+                logger.info(f"性能分析报告已生成: {path}")
+                await event.send(event.plain_result(f"📈 性能分析完成，报告: {path}"))
+        task = asyncio.create_task(notify())
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        target = f"接下来 {jobs} 个解析任务" if jobs else f"接下来 {seconds:g} 秒"
+        return f"📈 已开启性能分析 ({target})，完成后报告写入缓存目录。"
+
     async def try_delete(self, message_obj):
         """尝试撤回消息"""
         if not message_obj: return
@@ -105,131 +290,180 @@ class ParseHub(Star):
         if not title: return "unknown"
         return re.sub(r'[\\/*?:"<>|]', "", title).strip()[:50]
 
-    async def download_file(self, url: str, suffix: str = "") -> str:
-        """通用下载入口"""
+    async def download_file(self, url: str, suffix: str = "", mirrors: list = None, platform: str = None) -> str:
+        """
+        通用下载入口，mirrors 为同一资源的其他 CDN 地址。
+        请求头按地址的域名在注册表中查找；域名未注册时使用所属任务平台 (platform) 的 Referer，但不带 Cookie
+        """
         if not url: return None
         file_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
         filename = f"{file_hash}{suffix}"
         file_path = os.path.join(self.cache_dir, filename)
 
-        cookie = None
-        referer = None
-        if "douyin" in url:
-            cookie = self.douyin_handler.cookie
-            referer = "https://www.douyin.com/"
-        elif "bili" in url or "hdslb" in url:
-            referer = "https://www.bilibili.com/"
-        elif "xiaohongshu" in url or "xhscdn" in url:
-            referer = "https://www.xiaohongshu.com/"
-
-        success = await SmartDownloader.download(url, file_path, cookie, referer)
+        site = self.platforms.for_url(url)
+        cookie = site.cookie() if site and site.cookie else None
+        site = site or self.platforms.get(platform)
+        referer = site.referer if site else None
+
+        success = await SmartDownloader.download(url, file_path, cookie, referer, mirrors=mirrors)
         return file_path if success else None
 
+    def image_variants(self, item: MediaItem, platform: str = None) -> list:
+        """
+        图片 (含封面) 各镜像的缩放变体地址，按地址域名 (未注册时按任务平台) 选择改写函数；
+        未开启、不是图片或没有可用变体时返回 None
+        """
+        if not self.image_max_side or item.kind == MediaItem.VIDEO: return None
+        site = self.platforms.for_url(item.url) or self.platforms.get(platform)
+        if not site or not site.image_variant: return None
+        variants = [v for v in (site.image_variant(u, self.image_max_side, self.image_format) for u in item.mirrors) if v]
+        return variants if variants and variants != item.mirrors else None
+
+    async def download_media(self, item: MediaItem, platform: str, deadline: Deadline) -> str:
+        """
+        下载一个资源，有缩放变体时优先下载变体，失败再下载原图；
+        图片下载后交给 ImageProcessor 处理，已按内容 ID 缓存过的图片不再下载
+        """
+        is_image = item.kind != MediaItem.VIDEO
+        path = self.images.cached(item) if is_image else None
+        if path: return path
+
+        variants = self.image_variants(item, platform)
+        if variants:
+            path = await deadline.run(self.download_file(variants[0], f".{self.image_format}", variants, platform), "下载")
+            metrics.inc("image_variant", result="ok" if path else "fallback")
+        if not path:
+            path = await deadline.run(self.download_file(item.url, item.suffix, item.mirrors, platform), "下载")
+        if path and is_image:
+            path = await deadline.run(self.images.process(item, path), "压缩")
+        return path
+
     def detect_resource(self, event: AstrMessageEvent):
-        """识别消息中的平台链接"""
-        text = event.message_str
-        
-        for pattern in self.regex_xhs:
-            match = re.search(pattern, text)
-            if match: return "xhs", f"https://{match.group()}"
-        
-        for pattern in self.regex_douyin:
-            match = re.search(pattern, text)
-            if match: return "dy", f"https://{match.group()}"
-            
-        for pattern in self.regex_bili:
-            match = re.search(pattern, text)
-            if match: return "bili", f"https://{match.group()}"
+        """识别消息中的平台链接，返回 (平台键, 链接)"""
+        platform, url = self.platforms.detect(event.message_str)
+        if platform: return platform.key, url
 
         try:
-            # 尝试从小程序卡片JSON中提取
+            # 尝试从小程序卡片JSON中提取，保留完整链接 (小红书需要其中的 xsec_token 等参数)
             raw_str = str(event.message_obj)
-            if "qqdocurl" in raw_str and "bilibili" in raw_str:
-                match = re.search(r'(http[s]?://[\w\./\?=&]+)', raw_str)
-                if match and "bilibili" in match.group(1): return "bili", match.group(1)
-
-            if "jumpUrl" in raw_str and "xiaohongshu" in raw_str:
-                match = re.search(r'(http[s]?://[\w\./\?=&]+)', raw_str)
-                if match and "xiaohongshu" in match.group(1): return "xhs", match.group(1)
+            if "qqdocurl" in raw_str or "jumpUrl" in raw_str:
+                for url in re.findall(r'http[s]?://[\w\./\?=&]+', raw_str):
+                    platform, _ = self.platforms.detect(url)
+                    if platform: return platform.key, url
         except: pass
 
         return None, None
 
     async def dispatch_parsing(self, event: AstrMessageEvent, platform: str, url: str):
         """分发解析任务"""
-        logger.info(f"触发解析: 平台={platform}, URL={url}")
-        
-        parsing_msg = await event.send(event.plain_result(f"🔍 正在解析{platform}..."))
+        with tracing.job("job", platform=platform, url=url) as root:
+            logger.info(f"触发解析: 平台={platform}, URL={url}")
+            deadline = Deadline(self.job_timeout)
+            start = time.monotonic()
+            profile = profiling.session
+            if profile: profile.job_started()
+            try:
+                async for m in self._run_job(event, platform, url, deadline): yield m
+                metrics.inc("jobs", platform=platform, outcome="done")
+            except StageTimeout as e:
+                metrics.inc("jobs", platform=platform, outcome="stage_timeout")
+                if root: root.set(timeout_stage=e.stage)
+                logger.warning(f"请求超时: 阶段={e.stage}, URL={url}")
+                yield event.plain_result(f"⏱️ {e.stage}阶段请求超时，任务已取消，请稍后重试。")
+            except DeadlineExceeded as e:
+                metrics.inc("jobs", platform=platform, outcome="timeout")
+                if root: root.set(timeout_stage=e.stage)
+                logger.warning(f"解析超时: 阶段={e.stage}, URL={url}")
+                yield event.plain_result(f"⏱️ 处理超时（超过 {self.job_timeout} 秒，停止于{e.stage}阶段），任务已取消。")
+            finally:
+                metrics.observe(f"job.{platform}", time.monotonic() - start)
+                if profile: profile.job_finished()
+
+    async def _run_job(self, event: AstrMessageEvent, platform: str, url: str, deadline: Deadline):
+        """执行单个解析任务，各阶段共享同一个截止时间"""
+        site = self.platforms.get(platform)
+        parsing_msg = await event.send(event.plain_result(f"🔍 正在解析{site.name if site else platform}..."))
         
         result = None
-        handler = None
-        
-        if platform == "xhs":
-            handler = self.xhs_handler
-            result = await handler.parse(url)
-        elif platform == "dy":
-            handler = self.douyin_handler
-            result = await handler.parse(url)
-        elif platform == "bili":
-            handler = self.bili_handler
-            result = await handler.parse(url)
-
-        await self.try_delete(parsing_msg)
+        try:
+            # 超时/熔断等异常时同样撤回 "正在解析" 提示
+            try:
+                if site and site.handler:
+                    handler = site.handler
+                    with metrics.timer(f"parse.{platform}"):
+                        result = await deadline.run(self.throttle.run(platform, url, handler.parse(url)), "解析")
+                if result and not result.success:
+                    metrics.error(f"parse.{platform}", "throttled" if result.throttled else "failed")
+            finally:
+                await self.try_delete(parsing_msg)
+        except CircuitOpen as e:
+            logger.warning(f"熔断中，拒绝请求: 平台={platform}, URL={url}")
+            yield event.plain_result(f"🚦 {site.name}接口触发限流，暂停请求中，请 {int(e.retry_after) + 1} 秒后再试。")
+            return
 
         if not result:
             yield event.plain_result("❌ 解析器未返回结果。")
             return
 
-        # B站特殊处理逻辑
-        if platform == "bili":
-            if not result["success"]:
-                yield event.plain_result(f"❌ 解析失败: {result['msg']}")
-                return
-
-            # 如果不下载，仅展示直链
-            if not self.bili_download:
-                stream_url = await handler.get_stream_url(result)
-                if stream_url: result["video_url"] = stream_url
-                async for m in self.process_parse_result(event, result, "B站", None): yield m
-                return
-            
-            # 登录逻辑处理
-            if handler.use_login:
-                is_valid = await handler.check_cookie_valid()
-                if not is_valid:
-                    qr_data = await handler.get_login_qr()
-                    if qr_data:
-                        await event.send(event.chain_result([
-                            Plain("⚠️ 需登录下载高清视频，请扫码:"),
-                            Image.fromFileSystem(qr_data["img_path"])
-                        ]))
-                        success = False
-                        for _ in range(15):
-                            await asyncio.sleep(2)
-                            if await handler.poll_login(qr_data["key"]):
-                                success = True; await event.send(event.plain_result("✅ 登录成功！")); break
-                        if not success:
-                            yield event.plain_result("❌ 登录超时。"); return
-
-            dl_msg = await event.send(event.plain_result("📥 正在下载并合并B站视频...")) if self.show_all_tips else None
-            local_path = await handler.download_bili_video(result)
-            await self.try_delete(dl_msg)
-
-            if not local_path:
-                yield event.plain_result("⚠️ 视频下载失败，仅发送封面。")
-                async for m in self.process_parse_result(event, result, "B站", None): yield m
-            else:
-                async for m in self.process_parse_result(event, result, "B站", local_path): yield m
+        if site.deliver: messages = site.deliver(event, result, deadline)
+        else: messages = self.process_parse_result(event, result, None, deadline)
+        async for m in messages: yield m
+
+    async def _deliver_bili(self, event: AstrMessageEvent, result, deadline: Deadline):
+        """B站：默认只展示直链；开启下载时先检查登录，再下载合并后发送文件"""
+        handler = self.bili_handler
+        if not result.success:
+            async for m in self.process_parse_result(event, result, None, deadline): yield m
+            return
+
+        # 如果不下载，仅展示直链
+        if not self.bili_download:
+            stream_url = await deadline.run(handler.get_stream_url(result), "获取直链")
+            if stream_url: result.stream_url = stream_url
+            async for m in self.process_parse_result(event, result, None, deadline): yield m
+            return
         
-        # 其他平台通用处理
-        else:
-            display_name = "小红书" if platform == "xhs" else "抖音"
-            async for m in self.process_parse_result(event, result, display_name): yield m
+        # 登录逻辑处理
+        if handler.use_login:
+            is_valid = await deadline.run(handler.check_cookie_valid(), "登录检查")
+            if not is_valid:
+                qr_data = await deadline.run(handler.get_login_qr(), "登录检查")
+                if qr_data:
+                    await event.send(event.chain_result([
+                        Plain("⚠️ 需登录下载高清视频，请扫码:"),
+                        Image.fromFileSystem(qr_data["img_path"])
+                    ]))
+                    success = False
+                    for _ in range(15):
+                        await asyncio.sleep(2)
+                        if await handler.poll_login(qr_data["key"]):
+                            success = True; await event.send(event.plain_result("✅ 登录成功！")); break
+                    if not success:
+                        yield event.plain_result("❌ 登录超时。"); return
+
+        dl_msg = await event.send(event.plain_result("📥 正在下载并合并B站视频...")) if self.show_all_tips else None
+        with metrics.timer("bili.download"):
+            local_path = await deadline.run(handler.download_bili_video(result), "下载合并")
+        await self.try_delete(dl_msg)
+
+        if not local_path:
+            yield event.plain_result("⚠️ 视频下载失败，仅发送封面。")
+        async for m in self.process_parse_result(event, result, local_path, deadline): yield m
 
     @filter.command("jx")
     async def jx_cmd(self, event: AstrMessageEvent):
-        """手动解析指令"""
-        platform, url = self.detect_resource(event)
+        """手动解析指令；/jx stats 查看运行统计，/jx profile 性能分析 (仅管理员)"""
+        args = event.message_str.strip().lstrip("/").split()
+        if args[1:2] in (["stats"], ["profile"]):
+            if not event.is_admin():
+                yield event.plain_result("⚠️ 仅管理员可使用该指令。")
+            elif args[1] == "stats":
+                yield event.plain_result(self.format_stats())
+            else:
+                yield event.plain_result(self.profile_cmd(event, args[2:]))
+            return
+        with metrics.timer("detect"):
+            platform, url = self.detect_resource(event)
         if not platform:
             yield event.plain_result("⚠️ 未检测到支持的链接 (抖音/小红书/B站)")
             return
@@ -241,97 +475,96 @@ class ParseHub(Star):
         if not self.auto_parse: return
         if event.message_str.strip().startswith("/"): return
 
-        platform, url = self.detect_resource(event)
+        with metrics.timer("detect"):
+            platform, url = self.detect_resource(event)
         if platform:
             async for m in self.dispatch_parsing(event, platform, url): yield m
 
-    async def process_parse_result(self, event, result, platform_name, local_video_path=None):
-        """统一结果处理与发送"""
-        if not result.get("success", False):
-            yield event.plain_result(f"❌ {platform_name}解析失败: {result.get('msg', '未知错误')}")
+    async def process_parse_result(self, event, result, local_video_path=None, deadline=None):
+        """统一结果处理与发送；按作品类型与各资源的类型决定下载和发送方式"""
+        deadline = deadline or Deadline(self.job_timeout)
+        if not result.success:
+            site = self.platforms.get(result.platform)
+            yield event.plain_result(f"❌ {site.name if site else result.platform}解析失败: {result.msg or '未知错误'}")
             return
 
-        title = result.get("title", "")
-        author = result.get("author", "")
-        desc = result.get("desc", "")
-        work_type = result.get("type", "video")
-        download_urls = result.get("download_urls", [])
-        video_url = result.get("video_url")
-        
-        clean_title = self.clean_filename(title)
-        info_text = f"【标题】{title}\n【作者】{author}\n\n{desc}"
+        clean_title = self.clean_filename(result.title)
+        info_text = f"【标题】{result.title}\n【作者】{result.author}\n\n{result.desc}"
         if len(info_text) > 250: info_text = info_text[:250] + "...\n(文案过长已折叠)"
         
-        if work_type == "video" and video_url:
-            info_text += f"\n\n🔗 视频直链:\n{video_url}"
-            if platform_name == "B站" and not self.bili_download:
-                info_text += "\n(注: B站直链有时效性且需Referer，建议复制到浏览器查看)"
+        if result.kind == MediaItem.VIDEO and result.stream_url:
+            info_text += f"\n\n🔗 视频直链:\n{result.stream_url}"
+            if result.notice: info_text += f"\n({result.notice})"
 
         yield event.plain_result(info_text)
 
-        # 无缓存模式/仅直链模式
+        # 无缓存模式/仅直链模式：图片直接按地址发送，视频只给直链
         if not self.enable_cache and not local_video_path:
-             for url in download_urls:
-                 try: yield event.chain_result([Image.fromURL(url)])
+             for item in result.media:
+                 if item.kind == MediaItem.VIDEO: continue
+                 variants = self.image_variants(item, result.platform)
+                 try: yield event.chain_result([Image.fromURL(variants[0] if variants else item.url)])
                  except: pass
              return
 
         # 已有本地文件 (B站下载模式)
         if local_video_path and os.path.exists(local_video_path):
+            deadline.check("上传")
             send_msg = await event.send(event.plain_result("📤 视频准备就绪，正在上传...")) if self.show_all_tips else None
             try:
                 final_filename = f"{clean_title}.mp4"
-                yield event.chain_result([File(name=final_filename, file=local_video_path)])
+                start = time.monotonic()
+                with tracing.span("upload", file=final_filename):
+                    yield event.chain_result([File(name=final_filename, file=local_video_path)])
+                self._record_upload(local_video_path, start)
             except Exception as e:
                 logger.error(f"B站发送失败: {e}")
                 yield event.plain_result("⚠️ 发送失败。")
             await self.try_delete(send_msg)
             return
 
-        # 需要下载的情况
+        # 视频作品只发第一个视频，没有视频时 (如 B站仅直链模式) 发封面；图文逐个发送，其中的视频片段按视频文件发出
+        if result.kind == MediaItem.VIDEO:
+            items = result.videos()[:1] or [m for m in result.media if m.kind != MediaItem.VIDEO]
+        else:
+            items = result.media
+
         dl_msg = None
-        if self.show_all_tips and (work_type == "video" or download_urls):
+        if self.show_all_tips and items:
              dl_msg = await event.send(event.plain_result("📥 正在下载资源..."))
 
-        local_paths = []
-        if platform_name == "B站" and not self.bili_download:
-             for url in download_urls:
-                path = await self.download_file(url, suffix=".jpg")
-                if path: local_paths.append(path)
-        else:
-            if work_type == "video" and video_url:
-                path = await self.download_file(video_url, suffix=".mp4")
-                if path: local_paths.append(path)
-            elif download_urls:
-                for url in download_urls:
-                    path = await self.download_file(url, suffix=".jpg")
-                    if path: local_paths.append(path)
+        downloaded = []
+        for item in items:
+            path = await self.download_media(item, result.platform, deadline)
+            if path: downloaded.append((item, path))
 
         await self.try_delete(dl_msg)
 
-        if not local_paths:
-            if platform_name == "B站" and not self.bili_download: return
+        if not downloaded:
+            # 只有封面时下载失败不提示
+            if items and all(m.kind == MediaItem.COVER for m in items): return
             yield event.plain_result("❌ 资源下载失败。")
             return
 
+        deadline.check("上传")
         send_msg = None
         if self.show_all_tips:
-            send_msg = await event.send(event.plain_result(f"📤 正在上传 {len(local_paths)} 个文件..."))
+            send_msg = await event.send(event.plain_result(f"📤 正在上传 {len(downloaded)} 个文件..."))
 
         # 发送文件逻辑 (统一使用 File 组件)
-        if work_type == "video" and (platform_name != "B站" or self.bili_download):
+        for i, (item, path) in enumerate(downloaded):
+            if i > 0: await asyncio.sleep(3)
+            deadline.check("上传")
+            is_video = result.kind == MediaItem.VIDEO and item.kind == MediaItem.VIDEO
+            final_filename = f"{clean_title}.mp4" if is_video else f"{clean_title}_{i+1}{os.path.splitext(path)[1] or item.suffix}"
             try:
-                final_filename = f"{clean_title}.mp4"
-                yield event.chain_result([File(name=final_filename, file=local_paths[0])])
+                start = time.monotonic()
+                with tracing.span("upload", file=final_filename):
+                    yield event.chain_result([File(name=final_filename, file=path)])
+                self._record_upload(path, start)
             except Exception as e:
+                if not is_video: continue
                 logger.error(f"发送失败: {e}")
                 yield event.plain_result("⚠️ 视频发送失败。")
-        else:
-            for i, path in enumerate(local_paths):
-                if i > 0: await asyncio.sleep(3)
-                try:
-                    final_filename = f"{clean_title}_{i+1}.jpg"
-                    yield event.chain_result([File(name=final_filename, file=path)])
-                except: pass
         
         await self.try_delete(send_msg)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import tracing
+
+# 阶段耗时直方图的分桶上限 (秒)，覆盖从签名的毫秒级到 ffmpeg 合并的分钟级
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SAMPLES = 512  # 每个阶段保留最近多少个样本用于计算分位数
+PREFIX = "parsehub"
+
+
+class Histogram:
+    """累计分桶 (供 Prometheus) + 最近样本 (供 /jx stats 计算分位数)"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        if not self.recent: return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+# {阶段名: Histogram}；{(计数器名, ((标签, 值), ...)): 数值}
+_histograms = {}
+_counters = {}
+_started = time.time()
+
+
+def observe(stage: str, seconds: float):
+    """记录一次阶段耗时"""
+    hist = _histograms.get(stage)
+    if hist is None: hist = _histograms[stage] = Histogram()
+    hist.observe(seconds)
+
+
+def inc(name: str, value: float = 1, **labels):
+    """计数器累加，如 inc("bytes", n, kind="download")"""
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def error(stage: str, exc):
+    """按阶段与异常类名统计错误；exc 也可以直接传错误类别字符串"""
+    inc("errors", stage=stage, error=exc if isinstance(exc, str) else type(exc).__name__)
+
+
+@contextmanager
+def timer(stage: str, **attrs):
+    """
+    with metrics.timer("bili.api"): 统计块的耗时，可包住 await；
+    块内抛出异常时同时按异常类名计入错误计数。任务内同时记录一个同名 span，attrs 为 span 属性
+    """
+    start = time.monotonic()
+    try:
+        with tracing.span(stage, **attrs):
+            yield
+    except BaseException as e:
+        error(stage, e)
+        raise
+    finally:
+        observe(stage, time.monotonic() - start)
+
+
+def counter(name: str, **labels) -> float:
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def reset():
+    global _started
+    _histograms.clear()
+    _counters.clear()
+    _started = time.time()
+
+
+def summary() -> dict:
+    """各阶段的次数/均值/p50/p95/p99 (毫秒) 与全部计数器"""
+    stages = {
+        stage: {
+            "count": h.count,
+            "avg_ms": round(h.sum / h.count * 1000, 1) if h.count else 0,
+            "p50_ms": round(h.quantile(0.5) * 1000, 1),
+            "p95_ms": round(h.quantile(0.95) * 1000, 1),
+            "p99_ms": round(h.quantile(0.99) * 1000, 1),
+        } for stage, h in sorted(_histograms.items())
+    }
+    counters = {}
+    for (name, labels), value in sorted(_counters.items()):
+        suffix = ",".join(f"{k}={v}" for k, v in labels)
+        counters[f"{name}{{{suffix}}}" if suffix else name] = value
+    return {"uptime_seconds": round(time.time() - _started), "stages": stages, "counters": counters}
+
+
+def _labels(pairs) -> str:
+    if not pairs: return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus(gauges: list = None) -> str:
+    """
+    输出 Prometheus 文本格式。gauges 为额外的瞬时值，
+    元素形如 (名称, {标签: 值}, 数值)，用于导出熔断器/Cookie 池/代理池等状态
+    """
+    lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+    for stage, h in sorted(_histograms.items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h.buckets):
+            cumulative += n
+            lines.append(f'{PREFIX}_stage_seconds_bucket{_labels([("stage", stage), ("le", bound)])} {cumulative}')
+        lines.append(f'{PREFIX}_stage_seconds_bucket{_labels([("stage", stage), ("le", "+Inf")])} {h.count}')
+        lines.append(f'{PREFIX}_stage_seconds_sum{_labels([("stage", stage)])} {h.sum:.6f}')
+        lines.append(f'{PREFIX}_stage_seconds_count{_labels([("stage", stage)])} {h.count}')
+
+    typed = set()
+    for (name, labels), value in sorted(_counters.items()):
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            typed.add(name)
+        lines.append(f"{PREFIX}_{name}_total{_labels(labels)} {value:g}")
+
+    for name, labels, value in gauges or []:
+        if value is None: continue
+        if name not in typed:
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            typed.add(name)
+        lines.append(f"{PREFIX}_{name}{_labels(sorted(labels.items()))} {float(value):g}")
+    lines.append(f"{PREFIX}_uptime_seconds {time.time() - _started:.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, gauges: list = None):
+    """原子写入 Prometheus 文本文件，供 node_exporter textfile 收集器等读取"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: f.write(render_prometheus(gauges))
+    os.replace(tmp_path, path)
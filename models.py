@@ -0,0 +1,70 @@
+class MediaItem:
+    """待发送的一个媒体资源：主地址、同一资源的全部 CDN 镜像 (首个即主地址)、体积估计与内容 ID"""
+    __slots__ = ("url", "kind", "mirrors", "size_hint", "content_id")
+
+    VIDEO = "video"
+    IMAGE = "image"
+    COVER = "cover"  # 附带的封面，下载失败时不提示
+
+    def __init__(self, url: str, kind: str = IMAGE, mirrors: list = None, size_hint: int = 0, content_id: str = None):
+        self.url = url
+        self.kind = kind
+        self.mirrors = list(mirrors) if mirrors else [url]
+        self.size_hint = size_hint or 0    # 字节数，未知为 0
+        self.content_id = content_id       # 与 CDN 地址无关的资源标识，如 "作品ID:序号"
+
+    @property
+    def suffix(self) -> str:
+        return ".mp4" if self.kind == self.VIDEO else ".jpg"
+
+    def pack(self) -> tuple:
+        return self.url, self.kind, tuple(self.mirrors), self.size_hint, self.content_id
+
+    @classmethod
+    def unpack(cls, data: tuple):
+        return cls(*data)
+
+
+class ParseResult:
+    """
+    各平台处理器统一返回的解析结果。kind 为作品类型 (video/image)，media 为要发送的资源；
+    success 为 False 时 msg 为失败原因，throttled 表示收到了平台的限流信号
+    """
+    __slots__ = ("platform", "success", "msg", "throttled", "kind", "work_id",
+                 "title", "author", "desc", "media", "stream_url", "notice", "extra")
+
+    def __init__(self, platform: str, success: bool = False, msg: str = "", throttled: bool = False,
+                 kind: str = MediaItem.VIDEO, work_id: str = None, title: str = "", author: str = "", desc: str = "",
+                 media: list = None, stream_url: str = None, notice: str = "", extra: dict = None):
+        self.platform = platform
+        self.success = success
+        self.msg = msg
+        self.throttled = throttled
+        self.kind = kind
+        self.work_id = work_id
+        self.title = title
+        self.author = author
+        self.desc = desc
+        self.media = media or []
+        self.stream_url = stream_url   # 展示给用户的视频直链
+        self.notice = notice           # 附在直链后的说明
+        self.extra = extra or {}       # 平台私有字段，如 B站的 aid/cid
+
+    @classmethod
+    def fail(cls, platform: str, msg: str, throttled: bool = False):
+        return cls(platform, msg=msg, throttled=throttled)
+
+    def videos(self) -> list:
+        return [m for m in self.media if m.kind == MediaItem.VIDEO]
+
+    def pack(self) -> tuple:
+        """转为只含基本类型的元组，供结果缓存保存；可直接 JSON 序列化"""
+        return (self.platform, self.success, self.msg, self.throttled, self.kind, self.work_id,
+                self.title, self.author, self.desc, tuple(m.pack() for m in self.media),
+                self.stream_url, self.notice, tuple(self.extra.items()))
+
+    @classmethod
+    def unpack(cls, data: tuple):
+        *fields, media, stream_url, notice, extra = data
+        return cls(*fields, media=[MediaItem.unpack(m) for m in media],
+                   stream_url=stream_url, notice=notice, extra=dict(extra))
@@ -0,0 +1,114 @@
+import io
+import os
+import time
+import pstats
+import asyncio
+import cProfile
+import tracemalloc
+
+# 当前的性能分析会话；未开启时为 None，调用方只做一次判空，没有额外开销
+session = None
+
+
+class ProfileSession:
+    """
+    对接下来的 N 个任务或 T 秒做 cProfile + tracemalloc 分析，结束后在 out_dir 写出报告。
+    cProfile 统计的是事件循环线程上的全部代码，同时进行的其他任务也会计入；
+    签名开启 thread/process 模式时，线程池/进程中的计算不在统计范围内
+    """
+    TOP = 30
+
+    def __init__(self, out_dir: str, jobs: int = 0, seconds: float = 0):
+        self.out_dir = out_dir
+        self.jobs_left = jobs
+        self.seconds = seconds
+        self.jobs_done = 0
+        self.running = 0
+        self.profile = None
+        self.started = 0.0
+        self.cpu_started = 0.0
+        self.owns_tracemalloc = False
+        self.snapshot = None
+        self.timer = None
+        self.report_path = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    def start(self):
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc: tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        if self.seconds:
+            self.timer = asyncio.get_running_loop().call_later(self.seconds, self.finish)
+
+    def job_started(self):
+        # 按任务数分析时，等第一个任务到来再开始，避免把空闲时间算进去
+        if self.profile is None: self.start()
+        self.running += 1
+
+    def job_finished(self):
+        self.running -= 1
+        self.jobs_done += 1
+        if self.jobs_left and self.jobs_done >= self.jobs_left: self.finish()
+
+    def finish(self):
+        """停止分析并写出报告，返回报告路径；重复调用无效"""
+        global session
+        if session is self: session = None
+        if self.done.done(): return self.report_path
+        if self.timer: self.timer.cancel()
+        if self.profile is None:
+            self.done.set_result(None)
+            return None
+
+        self.profile.disable()
+        wall = time.perf_counter() - self.started
+        cpu = time.process_time() - self.cpu_started
+        end_snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.owns_tracemalloc: tracemalloc.stop()
+
+        name = time.strftime("profile-%Y%m%d-%H%M%S")
+        self.report_path = os.path.join(self.out_dir, f"{name}.txt")
+        self.profile.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(self._render(wall, cpu, current, peak, end_snapshot))
+        self.done.set_result(self.report_path)
+        return self.report_path
+
+    def _render(self, wall: float, cpu: float, current: int, peak: int, end_snapshot) -> str:
+        out = io.StringIO()
+        out.write(f"任务数: {self.jobs_done} (结束时仍在进行 {self.running})\n")
+        out.write(f"墙钟时间: {wall:.3f}s  CPU 时间: {cpu:.3f}s  CPU 占比: {cpu / wall * 100 if wall else 0:.1f}%\n")
+        out.write("(CPU 占比高说明时间花在签名/JSON 等计算或阻塞了事件循环，占比低说明主要在等待网络/磁盘 I/O；\n")
+        out.write(" cProfile 只统计事件循环线程，签名使用 thread/process 模式时其中的计算不在下列函数中)\n")
+        out.write(f"tracemalloc: 当前 {current / 1024:.0f} KiB  峰值 {peak / 1024:.0f} KiB\n")
+
+        for title, key in (("按自身耗时 (tottime)", "tottime"), ("按累计耗时 (cumulative)", "cumulative")):
+            out.write(f"\n===== 函数 Top {self.TOP} {title} =====\n")
+            pstats.Stats(self.profile, stream=out).strip_dirs().sort_stats(key).print_stats(self.TOP)
+
+        out.write(f"\n===== 内存分配增长 Top {self.TOP} (按代码行) =====\n")
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+        diff = end_snapshot.filter_traces(filters).compare_to(self.snapshot.filter_traces(filters), "lineno")
+        for stat in diff[:self.TOP]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
+
+
+def start(out_dir: str, jobs: int = 0, seconds: float = 0) -> ProfileSession:
+    """开启一次分析 (必须在事件循环内调用)；已有进行中的分析时返回 None"""
+    global session
+    if session is not None: return None
+    session = ProfileSession(out_dir, jobs=jobs, seconds=seconds)
+    if seconds: session.start()
+    return session
+
+
+def stop():
+    """提前结束当前分析，返回报告路径"""
+    return session.finish() if session else None
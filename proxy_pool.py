@@ -0,0 +1,183 @@
+import time
+import random
+import asyncio
+import aiohttp
+import ipaddress
+from urllib.parse import urlparse
+from contextlib import asynccontextmanager
+from astrbot.api import logger
+
+from .deadline import expired as deadline_expired
+
+
+def site_key(url: str) -> str:
+    """按主域名归并主机 (IP 原样返回)，同一 CDN 的不同节点共享延迟/记分等统计"""
+    host = urlparse(url).hostname or ""
+    if host.replace(".", "").isdigit(): return host
+    return ".".join(host.split(".")[-2:])
+
+
+class Proxy:
+    """池中的单个代理及其延迟/故障统计"""
+
+    def __init__(self, url: str):
+        self.url = url
+        # 日志与监控中只显示主机和端口，不输出账号密码
+        parsed = urlparse(url)
+        self.label = f"{parsed.hostname}:{parsed.port}" if parsed.port else (parsed.hostname or url)
+        self.latency = {}  # {站点: 延迟 EWMA (秒)}
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def ejected(self) -> float:
+        return max(0.0, self.ejected_until - time.monotonic())
+
+    def latency_for(self, site: str):
+        """该站点的延迟；没有记录时用该代理所有站点的均值"""
+        if site in self.latency: return self.latency[site]
+        if self.latency: return sum(self.latency.values()) / len(self.latency)
+        return None
+
+
+class ProxyPool:
+    """
+    出口代理池：按站点记录每个代理的延迟，请求时按延迟加权随机挑选 (越快权重越高)，
+    连续失败的代理暂时剔除，剔除时间随连续失败次数翻倍；后台定期探测，探测成功即恢复。
+    池为空、目标是本机/内网地址、或全部代理被剔除时直连
+    """
+    proxies = []
+    EWMA_ALPHA = 0.3
+    EJECT_AFTER = 2        # 连续失败多少次后剔除
+    MAX_EJECT = 600
+    eject_time = 60.0
+    probe_interval = 60.0
+    # 每个平台探测一个轻量地址，代理对各平台的延迟分开记录
+    PROBE_URLS = [
+        "https://www.douyin.com/favicon.ico",
+        "https://www.bilibili.com/favicon.ico",
+        "https://www.xiaohongshu.com/favicon.ico",
+    ]
+    # 连接层面的错误才算代理故障，HTTP 状态码错误与代理无关
+    FAILURES = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    _task = None
+
+    @classmethod
+    def configure(cls, proxies: list, probe_interval: float = 60, eject_time: float = 60):
+        urls = dict.fromkeys(p.strip() for p in proxies or [] if p and p.strip())
+        cls.proxies = [Proxy(url) for url in urls]
+        cls.probe_interval = max(0.0, float(probe_interval or 0))
+        cls.eject_time = max(1.0, float(eject_time or 1))
+        if cls.proxies: logger.info(f"代理池已载入 {len(cls.proxies)} 个代理")
+
+    @staticmethod
+    def _bypass(url: str) -> bool:
+        """本机与内网地址 (如本地部署的解析服务) 不走代理"""
+        host = urlparse(url).hostname or ""
+        if host == "localhost": return True
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return ip.is_loopback or ip.is_private or ip.is_link_local
+
+    @classmethod
+    def pick(cls, url: str):
+        """为 url 挑选一个代理，返回 Proxy；应直连时返回 None"""
+        if not cls.proxies or cls._bypass(url): return None
+        ready = [p for p in cls.proxies if not p.ejected()]
+        if not ready: return None
+
+        site = site_key(url)
+        latencies = [p.latency_for(site) for p in ready]
+        known = [l for l in latencies if l is not None]
+        # 没有延迟记录的代理按当前最快的计，保证新代理能被探索到
+        fastest = min(known) if known else 1.0
+        weights = [1 / max(l if l is not None else fastest, 0.01) for l in latencies]
+        return random.choices(ready, weights=weights)[0]
+
+    @classmethod
+    def report(cls, proxy, url: str, ok: bool, latency: float = None):
+        """记录一次经由代理的请求结果；proxy 为 None (直连) 时忽略"""
+        if proxy is None: return
+        if ok:
+            proxy.successes += 1
+            proxy.consecutive_failures = 0
+            proxy.ejected_until = 0.0
+            if latency is not None:
+                site = site_key(url)
+                old = proxy.latency.get(site)
+                proxy.latency[site] = latency if old is None else old + cls.EWMA_ALPHA * (latency - old)
+            return
+        proxy.failures += 1
+        proxy.consecutive_failures += 1
+        if proxy.consecutive_failures >= cls.EJECT_AFTER:
+            steps = proxy.consecutive_failures - cls.EJECT_AFTER
+            proxy.ejected_until = time.monotonic() + min(cls.eject_time * 2 ** steps, cls.MAX_EJECT)
+            logger.warning(f"代理 {proxy.label} 连续失败 {proxy.consecutive_failures} 次，暂停使用 {int(proxy.ejected())} 秒")
+
+    @classmethod
+    @asynccontextmanager
+    async def use(cls, url: str):
+        """
+        async with ProxyPool.use(url) as proxy: 传给 aiohttp 的 proxy= 参数 (可能为 None)。
+        块内抛出连接错误记为代理失败，正常结束按整个块的耗时记录延迟
+        """
+        proxy = cls.pick(url)
+        start = time.monotonic()
+        try:
+            yield proxy.url if proxy else None
+        except cls.FAILURES as e:
+            # 任务总预算耗尽导致的超时不是代理的问题
+            if not (isinstance(e, asyncio.TimeoutError) and deadline_expired()): cls.report(proxy, url, False)
+            raise
+        cls.report(proxy, url, True, time.monotonic() - start)
+
+    @classmethod
+    async def probe(cls):
+        """探测所有代理 (包括被剔除的) 到各平台的延迟"""
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession() as session:
+            async def one(proxy, url):
+                start = time.monotonic()
+                try:
+                    async with session.head(url, proxy=proxy.url, timeout=timeout, allow_redirects=False):
+                        pass
+                except Exception:
+                    cls.report(proxy, url, False)
+                    return
+                cls.report(proxy, url, True, time.monotonic() - start)
+            await asyncio.gather(*(one(p, u) for p in cls.proxies for u in cls.PROBE_URLS))
+
+    @classmethod
+    async def _probe_loop(cls):
+        while True:
+            try:
+                await cls.probe()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"代理探测出错: {e}")
+            await asyncio.sleep(cls.probe_interval)
+
+    @classmethod
+    def start(cls):
+        if cls.proxies and cls.probe_interval > 0 and cls._task is None:
+            cls._task = asyncio.create_task(cls._probe_loop())
+
+    @classmethod
+    def stop(cls):
+        if cls._task: cls._task.cancel()
+        cls._task = None
+
+    @classmethod
+    def snapshot(cls) -> list:
+        """每个代理的请求数、成功率、各站点延迟与剔除状态"""
+        return [{
+            "proxy": p.label,
+            "requests": p.successes + p.failures,
+            "success_rate": round(p.successes / (p.successes + p.failures), 3) if p.successes + p.failures else None,
+            "latency_ms": {site: round(l * 1000) for site, l in p.latency.items()},
+            "ejected_seconds": round(p.ejected(), 1),
+        } for p in cls.proxies]
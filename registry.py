@@ -0,0 +1,76 @@
+import re
+from urllib.parse import urlparse
+
+
+def host_suffixes(host: str):
+    """a.b.example.com 依次产出 a.b.example.com、b.example.com、example.com"""
+    host = host.lower().rstrip(".")
+    while host:
+        yield host
+        host = host.partition(".")[2]
+
+
+class Platform:
+    """
+    一个平台的注册信息：
+    hosts 为分享链接的域名后缀，media_hosts 为资源 CDN 的域名后缀 (只用于下载时挑选请求头)；
+    patterns 为链接正则，命中的部分补上 https:// 即交给 handler.parse 的地址；
+    referer/cookie 为下载该平台资源时的请求头策略，cookie 为返回当前 Cookie 的函数；
+    deliver 为解析成功后的发送流程 (异步生成器)，为 None 时使用通用流程；
+    image_variant 为图片缩放变体的改写函数 (见 imagevariant)，为 None 时总是下载原图
+    """
+    __slots__ = ("key", "name", "hosts", "media_hosts", "patterns", "referer", "cookie", "handler", "deliver",
+                 "image_variant")
+
+    def __init__(self, key: str, name: str, hosts: tuple, patterns: tuple, media_hosts: tuple = (),
+                 referer: str = "", cookie=None, handler=None, deliver=None, image_variant=None):
+        self.key = key
+        self.name = name
+        self.hosts = hosts
+        self.media_hosts = media_hosts
+        self.patterns = [re.compile(p) for p in patterns]
+        self.referer = referer
+        self.cookie = cookie
+        self.handler = handler
+        self.deliver = deliver
+        self.image_variant = image_variant
+
+
+class PlatformRegistry:
+    """按域名后缀索引的平台表：每个链接只需按域名逐级查字典，不必逐个平台试正则"""
+    # 消息中形如 域名/路径 的片段，协议可省略
+    LINK = re.compile(r'(?:https?://)?((?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,})(?:/[^\s"\'<>]*)?')
+
+    def __init__(self):
+        self.platforms = {}    # {平台键: Platform}
+        self._links = {}       # {链接域名后缀: Platform}
+        self._media = {}       # {CDN 域名后缀: Platform}
+
+    def register(self, platform: Platform) -> Platform:
+        self.platforms[platform.key] = platform
+        for host in platform.hosts: self._links[host] = platform
+        for host in platform.media_hosts: self._media[host] = platform
+        return platform
+
+    def get(self, key: str):
+        return self.platforms.get(key)
+
+    @staticmethod
+    def _lookup(index: dict, host: str):
+        """按域名逐级向上查找，见 host_suffixes"""
+        return next((index[h] for h in host_suffixes(host) if h in index), None)
+
+    def for_url(self, url: str):
+        """资源地址所属的平台 (链接域名与 CDN 域名都算)，未注册返回 None"""
+        host = urlparse(url).hostname or ""
+        return self._lookup(self._links, host) or self._lookup(self._media, host)
+
+    def detect(self, text: str):
+        """找出文本中第一个受支持的分享链接，返回 (Platform, 链接)，没有时返回 (None, None)"""
+        for match in self.LINK.finditer(text):
+            platform = self._lookup(self._links, match.group(1))
+            if platform is None: continue
+            for pattern in platform.patterns:
+                found = pattern.search(match.group())
+                if found: return platform, f"https://{found.group()}"
+        return None, None
@@ -0,0 +1,52 @@
+"""AwemeIdFetcher.get_aweme_id：长链接直接取 ID，短链接跟随重定向"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from douyin_scraper.crawlers.douyin.web.utils import AwemeIdFetcher, TokenManager  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, url: str):
+        self.url = url
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    """替换 TokenManager.request：记录请求地址，短链重定向到 /video/ 作品页"""
+    seen = []
+
+    async def request(method, url, timeout, retries=2, **kwargs):
+        seen.append(url)
+        return FakeResponse("https://www.douyin.com/video/7300000000000000002?previous_page=app_code_link")
+
+    monkeypatch.setattr(TokenManager, "request", request)
+    return seen
+
+
+@pytest.mark.parametrize("url, aweme_id", [
+    ("https://www.douyin.com/video/7300000000000000001", "7300000000000000001"),
+    ("https://www.douyin.com/video/7300000000000000001?modeFrom=", "7300000000000000001"),
+    ("https://www.douyin.com/note/7300000000000000003", "7300000000000000003"),
+    ("https://www.iesdouyin.com/share/video/7300000000000000004/?region=CN", "7300000000000000004"),
+])
+def test_full_link_skips_redirect(requests, url, aweme_id):
+    assert asyncio.run(AwemeIdFetcher.get_aweme_id(url)) == aweme_id
+    assert requests == []
+
+
+@pytest.mark.parametrize("url", [
+    "https://v.douyin.com/iRNBho6u/",
+    "https://www.douyin.com/video/share_abc",
+])
+def test_short_link_follows_redirect(requests, url):
+    assert asyncio.run(AwemeIdFetcher.get_aweme_id(url)) == "7300000000000000002"
+    assert requests == [url]
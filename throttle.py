@@ -0,0 +1,174 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+from .models import ParseResult
+
+
+class CircuitOpen(Exception):
+    """熔断器打开期间直接拒绝请求"""
+    def __init__(self, platform: str = "", retry_after: float = 0):
+        super().__init__(platform)
+        self.platform = platform
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，capacity 为允许的突发量"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """取一个令牌，不足时按补充速度等待（可被任务截止时间取消）"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            delay = (1 - self.tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    连续收到 threshold 次限流信号后打开，cooldown 秒内快速失败；
+    冷却结束进入半开状态，只放行一个探测请求，成功则恢复，失败则冷却时间加倍后重新打开
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60, max_cooldown: float = 600):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        """是否放行本次请求；放行半开探测时会占用探测名额"""
+        if self.state == self.OPEN and self.retry_after() <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED: return True
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, throttled: bool):
+        was_probe, self.probing = self.probing, False
+        if not throttled:
+            self.state, self.failures, self.cooldown = self.CLOSED, 0, self.base_cooldown
+            return
+        self.failures += 1
+        if was_probe:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        if was_probe or self.failures >= self.threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """探测请求未得出结论 (异常/取消) 时归还探测名额"""
+        self.probing = False
+
+
+class Throttle:
+    """
+    按平台限速与熔断。处理器在结果中置 throttled=True 表示收到限流信号
+    (抖音空响应、B站 -412、解析服务 429 等)；熔断期间命中缓存的链接直接返回缓存结果
+    """
+
+    def __init__(self, rate_per_minute: float = 60, burst: float = 5, threshold: int = 3,
+                 cooldown: float = 60, cache_ttl: float = 1800, cache_size: int = 256):
+        self.rate = max(rate_per_minute, 1) / 60
+        self.burst = max(burst, 1)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.buckets = {}
+        self.breakers = {}
+        self.cache = OrderedDict()
+        self.stats = {}
+
+    def _get(self, platform: str):
+        if platform not in self.buckets:
+            self.buckets[platform] = TokenBucket(self.rate, self.burst)
+            self.breakers[platform] = CircuitBreaker(self.threshold, self.cooldown)
+            self.stats[platform] = {"requests": 0, "throttled": 0, "rejected": 0, "cache_hits": 0}
+        return self.buckets[platform], self.breakers[platform], self.stats[platform]
+
+    def _cached(self, platform: str, key: str):
+        entry = self.cache.get((platform, key))
+        if not entry: return None
+        if time.monotonic() - entry[0] > self.cache_ttl:
+            del self.cache[(platform, key)]
+            return None
+        return ParseResult.unpack(entry[1])
+
+    def _store(self, platform: str, key: str, result: ParseResult):
+        # 缓存紧凑的元组，每次命中重建出独立的对象，调用方修改结果不影响缓存
+        self.cache[(platform, key)] = (time.monotonic(), result.pack())
+        self.cache.move_to_end((platform, key))
+        while len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+
+    async def run(self, platform: str, key: str, aw):
+        """限速后执行 aw；熔断打开时返回缓存结果，没有缓存则抛出 CircuitOpen"""
+        bucket, breaker, stats = self._get(platform)
+        if not breaker.allow():
+            if asyncio.iscoroutine(aw): aw.close()
+            cached = self._cached(platform, key)
+            if cached is not None:
+                stats["cache_hits"] += 1
+                return cached
+            stats["rejected"] += 1
+            raise CircuitOpen(platform, breaker.retry_after())
+
+        try:
+            await bucket.acquire()
+            stats["requests"] += 1
+            result = await aw
+        except BaseException:
+            breaker.release()
+            if asyncio.iscoroutine(aw): aw.close()
+            raise
+
+        throttled = bool(getattr(result, "throttled", False))
+        breaker.record(throttled)
+        if throttled:
+            stats["throttled"] += 1
+        elif getattr(result, "success", False):
+            self._store(platform, key, result)
+        return result
+
+    def snapshot(self) -> dict:
+        """各平台限速器与熔断器的当前状态，供监控输出"""
+        data = {}
+        for platform, breaker in self.breakers.items():
+            bucket = self.buckets[platform]
+            bucket._refill()
+            data[platform] = {
+                "state": breaker.state,
+                "consecutive_throttled": breaker.failures,
+                "retry_after": round(breaker.retry_after(), 1) if breaker.state != breaker.CLOSED else 0,
+                "tokens": round(bucket.tokens, 2),
+                "limiter_wait_seconds": round(bucket.waited, 3),
+                **self.stats[platform],
+            }
+        data["cache_entries"] = len(self.cache)
+        return data
@@ -0,0 +1,125 @@
+import os
+import time
+import uuid
+import logging
+from contextvars import ContextVar
+from contextlib import contextmanager
+
+from . import fastjson
+
+# 当前任务 ID 与当前 span，经 contextvars 自动传递到 await 的协程和 create_task 创建的子任务
+_job = ContextVar("parse_hub_job", default=None)
+_span = ContextVar("parse_hub_span", default=None)
+
+
+class Span:
+    __slots__ = ("job", "id", "parent", "name", "start", "attrs")
+
+    def __init__(self, job: str, name: str, parent, attrs: dict):
+        self.job = job
+        self.id = uuid.uuid4().hex[:8]
+        self.parent = parent.id if parent else None
+        self.name = name
+        self.start = time.time()
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _Exporter:
+    """把结束的 span 逐行写入 JSONL 文件，超过 max_bytes 时轮转为 .1"""
+
+    def __init__(self):
+        self.path = None
+        self.max_bytes = 0
+        self.file = None
+
+    def configure(self, path: str = None, max_mb: float = 20):
+        self.close()
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+
+    def write(self, record: dict):
+        if not self.path: return
+        try:
+            if self.file is None: self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(fastjson.dumps(record) + "\n")
+            if self.max_bytes and self.file.tell() > self.max_bytes:
+                self.close()
+                os.replace(self.path, self.path + ".1")
+        except OSError:
+            self.close()
+
+    def flush(self):
+        if self.file:
+            try: self.file.flush()
+            except OSError: pass
+
+    def close(self):
+        if self.file:
+            try: self.file.close()
+            except OSError: pass
+        self.file = None
+
+
+exporter = _Exporter()
+
+
+def configure(path: str = None, max_mb: float = 20):
+    """path 为 None 时只传递任务 ID，不导出 span"""
+    exporter.configure(path, max_mb)
+
+
+def current_job():
+    return _job.get()
+
+
+@contextmanager
+def job(name: str, **attrs):
+    """开始一个新任务：分配任务 ID，并以根 span 记录整个任务"""
+    token = _job.set(uuid.uuid4().hex[:12])
+    try:
+        with span(name, **attrs) as root:
+            yield root
+    finally:
+        exporter.flush()
+        # 异步生成器可能在其他上下文中被关闭，此时无需也无法还原
+        try: _job.reset(token)
+        except ValueError: pass
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """记录一个阶段的开始/结束时间与属性；不在任务内或未开启导出时只执行块本身"""
+    job_id = _job.get()
+    if job_id is None or not exporter.path:
+        yield None
+        return
+    current = Span(job_id, name, _span.get(), attrs)
+    token = _span.set(current)
+    status, error = "ok", None
+    try:
+        yield current
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        try: _span.reset(token)
+        except ValueError: pass
+        exporter.write({
+            "job": current.job, "span": current.id, "parent": current.parent, "name": name,
+            "start": round(current.start, 6), "duration_ms": round((time.time() - current.start) * 1000, 3),
+            "status": status, "error": error, "attrs": current.attrs,
+        })
+
+
+class JobLogFilter(logging.Filter):
+    """给任务内产生的日志加上 [job=ID] 前缀，便于在并发日志中筛出同一任务"""
+
+    def filter(self, record):
+        job_id = _job.get()
+        if job_id and not getattr(record, "parse_hub_job", None):
+            record.parse_hub_job = job_id
+            record.msg = f"[job={job_id}] {record.msg}"
+        return True
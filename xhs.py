@@ -1,11 +1,59 @@
+import time
+import asyncio
 import aiohttp
 import re
-import json
 from astrbot.api import logger
 
+from .deadline import budget, expired as deadline_expired
+from . import fastjson
+from .proxy_pool import ProxyPool
+from .models import MediaItem, ParseResult
+from . import metrics
+
+
+class XhsBackend:
+    """一个 XHS-Downloader 实例及其负载/延迟统计"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0   # 进行中的请求数
+        self.latency = None    # 成功请求耗时的 EWMA (秒)
+        self.successes = 0
+        self.failures = 0
+        self.healthy = True
+
+
 class XhsHandler:
-    def __init__(self, api_url: str):
-        self.api_url = api_url
+    """
+    多个 XHS-Downloader 实例组成的后端池：共用一个保持连接的会话，
+    按进行中请求数最少 (同数按延迟) 选择后端，出错或超时时换下一个；
+    失败的后端标记为不健康并排到最后，由后台健康检查恢复
+    """
+    EWMA_ALPHA = 0.3
+    TIMEOUT = 15
+
+    def __init__(self, api_url: str, api_urls: list = None, health_interval: float = 30):
+        urls = dict.fromkeys(u.strip() for u in [api_url, *(api_urls or [])] if u and u.strip())
+        self.backends = [XhsBackend(url) for url in urls]
+        self.health_interval = max(0.0, float(health_interval or 0))
+        self.session = None
+        self.health_task = None
+
+    def _session(self):
+        # 会话需在事件循环内创建，首次请求时才建立
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(keepalive_timeout=60))
+        return self.session
+
+    def start(self):
+        if len(self.backends) > 1 and self.health_interval > 0 and self.health_task is None:
+            self.health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self.health_task: self.health_task.cancel()
+        self.health_task = None
+        if self.session: await self.session.close()
+        self.session = None
 
     def extract_url(self, text: str):
         pattern = r'(https?://[^\s]+)'
@@ -13,44 +61,109 @@ class XhsHandler:
         if match: return match.group(0)
         return None
 
-    async def parse(self, target_url: str) -> dict:
-        result = {
-            "success": False, "msg": "", "type": "unknown",
-            "title": "", "author": "", "desc": "",
-            "download_urls": [], "dynamic_urls": [], "video_url": None
-        }
+    def _ordered(self) -> list:
+        """健康的在前，其次进行中请求最少，再按延迟；没有延迟记录的视为 0 以便探测"""
+        return sorted(self.backends, key=lambda b: (not b.healthy, b.outstanding, b.latency or 0.0))
 
+    def _record(self, backend: XhsBackend, ok: bool, latency: float = None):
+        if not ok:
+            backend.failures += 1
+            if backend.healthy: logger.warning(f"XHS 后端 {backend.url} 请求失败，暂时跳过")
+            backend.healthy = False
+            return
+        backend.successes += 1
+        backend.healthy = True
+        backend.latency = latency if backend.latency is None else backend.latency + self.EWMA_ALPHA * (latency - backend.latency)
+
+    async def check_health(self):
+        """请求各后端根路径，能返回任意 HTTP 响应即视为存活"""
+        session = self._session()
+        timeout = aiohttp.ClientTimeout(total=5)
+
+        async def one(backend):
+            try:
+                async with ProxyPool.use(backend.url) as proxy:
+                    async with session.get(backend.url, timeout=timeout, proxy=proxy) as resp:
+                        alive = resp.status < 500
+            except Exception:
+                alive = False
+            if alive != backend.healthy:
+                logger.info(f"XHS 后端 {backend.url} {'已恢复' if alive else '健康检查失败'}")
+            backend.healthy = alive
+        await asyncio.gather(*(one(b) for b in self.backends))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def _post(self, backend: XhsBackend, target_url: str):
+        """向一个后端发送解析请求，返回 (HTTP 状态码, JSON)"""
+        backend.outstanding += 1
         try:
-            async with aiohttp.ClientSession() as session:
-                timeout = aiohttp.ClientTimeout(total=15)
-                async with session.post(self.api_url, json={"url": target_url}, timeout=timeout) as resp:
-                    if resp.status != 200:
-                        result["msg"] = f"API请求失败，状态码: {resp.status}"
-                        return result
-                    res_json = await resp.json()
-        except Exception as e:
-            result["msg"] = f"连接解析服务出错: {e}"
-            return result
+            async with ProxyPool.use(backend.url) as proxy:
+                timeout = aiohttp.ClientTimeout(total=budget(self.TIMEOUT))
+                async with self._session().post(backend.url, json={"url": target_url}, timeout=timeout, proxy=proxy) as resp:
+                    if resp.status != 200: return resp.status, None
+                    return resp.status, await fastjson.read_json(resp)
+        finally:
+            backend.outstanding -= 1
+
+    def snapshot(self) -> list:
+        """各后端的健康状态、进行中请求数、成功率与延迟"""
+        return [{
+            "backend": b.url,
+            "healthy": b.healthy,
+            "outstanding": b.outstanding,
+            "requests": b.successes + b.failures,
+            "success_rate": round(b.successes / (b.successes + b.failures), 3) if b.successes + b.failures else None,
+            "latency_ms": round(b.latency * 1000) if b.latency is not None else None,
+        } for b in self.backends]
+
+    async def parse(self, target_url: str) -> ParseResult:
+        res_json = None
+        errors = []
+        throttled = 0
+        for backend in self._ordered():
+            start = time.monotonic()
+            try:
+                with metrics.timer("xhs.api", backend=backend.url):
+                    status, res_json = await self._post(backend, target_url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                errors.append(f"{backend.url}: {str(e) or type(e).__name__}")
+                # 任务总预算耗尽导致的超时不是后端的问题，也没有时间再换后端
+                if isinstance(e, asyncio.TimeoutError) and deadline_expired(): break
+                self._record(backend, False)
+                continue
+            if status == 200:
+                self._record(backend, True, time.monotonic() - start)
+                break
+            # 5xx/429 换下一个后端重试，其余状态码说明请求本身有问题，直接返回
+            if status < 500 and status != 429:
+                return ParseResult.fail("xhs", f"API请求失败，状态码: {status}")
+            self._record(backend, False)
+            throttled += status in (429, 503)
+            errors.append(f"{backend.url}: HTTP {status}")
+
+        if res_json is None:
+            # 所有后端都返回限流状态码时交给熔断器统计
+            return ParseResult.fail("xhs", f"连接解析服务出错: {'; '.join(errors) or '未配置解析服务地址'}",
+                                    throttled=bool(errors) and throttled == len(errors))
 
         data = res_json.get("data")
         if not data:
-            result["msg"] = res_json.get("message", "解析服务返回未知错误")
-            return result
-
-        result["success"] = True
-        result["title"] = data.get("作品标题", "无标题")
-        result["author"] = data.get("作者昵称", "未知作者")
-        result["desc"] = data.get("作品描述", "")
-        raw_type = data.get("作品类型", "")
-        result["download_urls"] = data.get("下载地址", [])
-        result["dynamic_urls"] = data.get("动图地址", [])
-
-        if raw_type == "视频":
-            result["type"] = "video"
-            if result["download_urls"]: result["video_url"] = result["download_urls"][0]
-        elif raw_type == "图文":
-            result["type"] = "image"
-        else:
-            result["type"] = "unknown"
+            return ParseResult.fail("xhs", res_json.get("message", "解析服务返回未知错误"))
+
+        note_id = data.get("作品ID")
+        kind = {"视频": MediaItem.VIDEO, "图文": MediaItem.IMAGE}.get(data.get("作品类型", ""), "unknown")
+        media_kind = MediaItem.VIDEO if kind == MediaItem.VIDEO else MediaItem.IMAGE
+        media = [MediaItem(url, media_kind, content_id=f"xhs:{note_id}:{i}" if note_id else None)
+                 for i, url in enumerate(data.get("下载地址") or []) if url]
+        result = ParseResult(
+            "xhs", success=True, kind=kind, work_id=note_id,
+            title=data.get("作品标题", "无标题"), author=data.get("作者昵称", "未知作者"),
+            desc=data.get("作品描述", ""), media=media,
+        )
+        if kind == MediaItem.VIDEO and media: result.stream_url = media[0].url
 
         return result
\ No newline at end of file